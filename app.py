@@ -6,9 +6,10 @@ import os
 import io
 import re
 import PyPDF2
-from utils.data_processor import load_and_process_csv, validate_csv
+from utils.data_processor import load_and_process_csv, validate_csv, convert_categorical_columns, get_column_order
 from utils.formula_engine import apply_formula, calculate_performance_metrics
 from utils.visualization import create_asset_class_chart, create_selection_comparison_chart, create_risk_return_scatter
+from utils.data_storage import dataframe_to_csv_bytes
 
 def extract_apir_codes_from_pdf(pdf_file):
     """
@@ -87,6 +88,19 @@ def filter_investments_by_apir(df, apir_codes):
     filtered_df = df[df['APIR Code'].isin(apir_codes)]
     return filtered_df
 
+@st.cache_data
+def get_risk_return_scatter(df):
+    """
+    Build the risk-return scatter plot, cached until the data changes.
+    
+    Parameters:
+    df (DataFrame): DataFrame containing investment data
+    
+    Returns:
+    Figure: Plotly figure object
+    """
+    return create_risk_return_scatter(df)
+
 st.set_page_config(
     page_title="Investment Selection Tool",
     page_icon="📊",
@@ -158,6 +172,7 @@ def main():
                     try:
                         # Combine all dataframes
                         combined_data = pd.concat(st.session_state.dataframes, ignore_index=True)
+                        combined_data = convert_categorical_columns(combined_data)
                         st.session_state.combined_data = combined_data
                         
                         # Calculate averages only for specific fields by Morningstar Category
@@ -175,7 +190,7 @@ def main():
                         subset_for_avg = combined_data[['Morningstar Category'] + existing_fields].copy()
                         
                         # Calculate averages by Morningstar Category for specific fields only
-                        st.session_state.asset_class_averages = subset_for_avg.groupby('Morningstar Category').mean(numeric_only=True)
+                        st.session_state.asset_class_averages = subset_for_avg.groupby('Morningstar Category', observed=True).mean(numeric_only=True)
                         
                     except Exception as e:
                         st.error(f"Error calculating asset class averages: {str(e)}")
@@ -278,38 +293,17 @@ def main():
         with tabs[0]:
             # Ensure the dataframe displays the specified columns first
             if st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
-                # Define the column order with specified columns first
-                ordered_columns = [
-                    'Name',
-                    'APIR Code',
-                    'Morningstar Category',
-                    '3 Years Annualised (%)',
-                    'Investment Management Fee(%)',
-                    'Equity StyleBox™',
-                    'Morningstar Rating',
-                    '3 Year Beta',
-                    '3 Year Standard Deviation',
-                    '3 Year Sharpe Ratio'
-                ]
-                
-                # Get the actual columns from the dataframe 
-                existing_columns = list(st.session_state.combined_data.columns)
-                
-                # Keep only columns that exist in the actual dataframe
-                ordered_columns = [col for col in ordered_columns if col in existing_columns]
-                
-                # Add any remaining columns that weren't specified in the order
-                remaining_columns = [col for col in existing_columns if col not in ordered_columns]
-                final_column_order = ordered_columns + remaining_columns
+                # Place the key columns first, followed by any others
+                final_column_order = get_column_order(st.session_state.combined_data.columns)
                 
                 # Reorder the dataframe columns
-                reordered_df = st.session_state.combined_data[final_column_order].copy()
+                reordered_df = st.session_state.combined_data[final_column_order]
                 
                 # Display the reordered dataframe
                 st.dataframe(reordered_df, use_container_width=True)
                 
                 # Export combined data
-                csv_combined = reordered_df.to_csv(index=False)
+                csv_combined = dataframe_to_csv_bytes(reordered_df)
                 st.download_button(
                     label="Download Combined Data",
                     data=csv_combined,
@@ -328,7 +322,7 @@ def main():
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Export category averages
-                csv_averages = st.session_state.asset_class_averages.to_csv()
+                csv_averages = dataframe_to_csv_bytes(st.session_state.asset_class_averages, index=True)
                 st.download_button(
                     label="Download Category Averages",
                     data=csv_averages,
@@ -341,7 +335,7 @@ def main():
         with tabs[2]:
             # Create risk-return scatter plot
             if st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
-                risk_return_fig = create_risk_return_scatter(st.session_state.combined_data)
+                risk_return_fig = get_risk_return_scatter(st.session_state.combined_data)
                 st.plotly_chart(risk_return_fig, use_container_width=True)
             else:
                 st.info("No data available for risk-return analysis")
@@ -382,31 +376,11 @@ def main():
         else:
             # Define the column order with specified columns first
             if 'APIR Code' in st.session_state.hub24_filtered.columns:
-                ordered_columns = [
-                    'Name',
-                    'APIR Code',
-                    'Morningstar Category',
-                    '3 Years Annualised (%)',
-                    'Investment Management Fee(%)',
-                    'Equity StyleBox™',
-                    'Morningstar Rating',
-                    '3 Year Beta',
-                    '3 Year Standard Deviation',
-                    '3 Year Sharpe Ratio'
-                ]
-                
-                # Get the actual columns from the dataframe
-                existing_columns = list(st.session_state.hub24_filtered.columns)
-                
-                # Keep only columns that exist in the actual dataframe
-                ordered_columns = [col for col in ordered_columns if col in existing_columns]
-                
-                # Add any remaining columns that weren't specified in the order
-                remaining_columns = [col for col in existing_columns if col not in ordered_columns]
-                final_column_order = ordered_columns + remaining_columns
+                # Place the key columns first, followed by any others
+                final_column_order = get_column_order(st.session_state.hub24_filtered.columns)
                 
                 # Reorder the dataframe columns
-                reordered_df = st.session_state.hub24_filtered[final_column_order].copy()
+                reordered_df = st.session_state.hub24_filtered[final_column_order]
                 
                 # Display the reordered dataframe
                 st.dataframe(reordered_df, use_container_width=True)
@@ -416,7 +390,7 @@ def main():
                     st.subheader("HUB24 Options Performance")
                     
                     # Create risk-return scatter plot for HUB24 options
-                    risk_return_fig = create_risk_return_scatter(reordered_df)
+                    risk_return_fig = get_risk_return_scatter(reordered_df)
                     st.plotly_chart(risk_return_fig, use_container_width=True)
                     
                     # Export HUB24 filtered investments
@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import os
 import io
-from utils.data_processor import load_and_process_csv, validate_csv
+from utils.data_processor import load_and_process_csv, validate_csv, convert_categorical_columns, get_column_order
 
 # Set page configuration
 st.set_page_config(
@@ -87,6 +87,7 @@ if uploaded_files:
             try:
                 # Combine all dataframes
                 combined_data = pd.concat(st.session_state['dataframes'], ignore_index=True)
+                combined_data = convert_categorical_columns(combined_data)
                 
                 # Store combined data in session state
                 st.session_state['combined_data'] = combined_data.copy()
@@ -113,7 +114,7 @@ if uploaded_files:
                 subset_for_avg = combined_data[['Morningstar Category'] + existing_fields].copy()
                 
                 # Calculate averages by Morningstar Category for specific fields only
-                st.session_state['asset_class_averages'] = subset_for_avg.groupby('Morningstar Category').mean(numeric_only=True)
+                st.session_state['asset_class_averages'] = subset_for_avg.groupby('Morningstar Category', observed=True).mean(numeric_only=True)
                 
 
                 
@@ -153,35 +154,14 @@ if st.session_state['combined_data'] is not None and not st.session_state['combi
     # Show sample of the data
     st.subheader("Sample Data (5 rows)")
     
-    # Define the column order with specified columns first
-    ordered_columns = [
-        'Name',
-        'APIR Code',
-        'Morningstar Category',
-        '3 Years Annualised (%)',
-        'Investment Management Fee(%)',
-        'Equity StyleBox™',
-        'Morningstar Rating',
-        '3 Year Beta',
-        '3 Year Standard Deviation',
-        '3 Year Sharpe Ratio'
-    ]
+    # Place the key columns first, followed by any others
+    final_column_order = get_column_order(st.session_state['combined_data'].columns)
     
-    # Get the actual columns from the dataframe 
-    existing_columns = list(st.session_state['combined_data'].columns)
-    
-    # Keep only columns that exist in the actual dataframe
-    ordered_columns = [col for col in ordered_columns if col in existing_columns]
-    
-    # Add any remaining columns that weren't specified in the order
-    remaining_columns = [col for col in existing_columns if col not in ordered_columns]
-    final_column_order = ordered_columns + remaining_columns
-    
-    # Reorder the dataframe columns
-    reordered_df = st.session_state['combined_data'][final_column_order].copy()
+    # Reorder the columns of the first 5 rows only
+    reordered_df = st.session_state['combined_data'].head(5)[final_column_order]
     
     # Display the first 5 rows
-    st.dataframe(reordered_df.head(5), use_container_width=True)
+    st.dataframe(reordered_df, use_container_width=True)
 
 # Display information about file format as simple text, not in a box
 st.subheader("Expected CSV Format")
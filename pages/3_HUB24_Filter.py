@@ -4,6 +4,7 @@ import numpy as np
 import re
 import PyPDF2
 from utils.visualization import create_risk_return_scatter
+from utils.data_processor import get_column_order
 
 # Set page configuration
 st.set_page_config(
@@ -170,32 +171,11 @@ if st.session_state.hub24_filtered is not None:
         
         # Export functionality is still useful to keep
         if 'APIR Code' in st.session_state.hub24_filtered.columns:
-            # Define the column order with specified columns first
-            ordered_columns = [
-                'Name',
-                'APIR Code',
-                'Morningstar Category',
-                '3 Years Annualised (%)',
-                'Investment Management Fee(%)',
-                'Equity StyleBox™',
-                'Morningstar Rating',
-                '3 Year Beta',
-                '3 Year Standard Deviation',
-                '3 Year Sharpe Ratio'
-            ]
-            
-            # Get the actual columns from the dataframe
-            existing_columns = list(st.session_state.hub24_filtered.columns)
-            
-            # Keep only columns that exist in the actual dataframe
-            ordered_columns = [col for col in ordered_columns if col in existing_columns]
-            
-            # Add any remaining columns that weren't specified in the order
-            remaining_columns = [col for col in existing_columns if col not in ordered_columns]
-            final_column_order = ordered_columns + remaining_columns
+            # Place the key columns first, followed by any others
+            final_column_order = get_column_order(st.session_state.hub24_filtered.columns)
             
             # Reorder the dataframe columns for export
-            reordered_df = st.session_state.hub24_filtered[final_column_order].copy()
+            reordered_df = st.session_state.hub24_filtered[final_column_order]
             
             # Export HUB24 filtered investments
             csv_hub24 = reordered_df.to_csv(index=False)
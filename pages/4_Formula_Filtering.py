@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 from utils.formula_engine import apply_formula, calculate_performance_metrics
 from utils.visualization import create_selection_comparison_chart
+from utils.data_processor import count_by_category, downcast_numeric_columns
 
 # Set page configuration
 st.set_page_config(
@@ -13,6 +14,11 @@ st.set_page_config(
 
 st.title("Formula Filtering")
 
+# Function to index funds by name for direct lookups, cached per filtered selection
+@st.cache_data
+def get_funds_by_name(df):
+    return df.set_index('Name', drop=False)
+
 # Initialize session state variables if they don't exist
 if 'combined_data' not in st.session_state:
     st.session_state['combined_data'] = None
@@ -216,34 +222,50 @@ if st.session_state.filtered_selection is not None:
             You can add comments for each selection to explain your rationale.
             """)
             
-            # Form for adding a fund to the portfolio
-            fund_selector = st.selectbox(
-                "Select a fund to add to your recommended portfolio",
-                options=st.session_state.filtered_selection['Name'].tolist(),
-                key="fund_selector"
+            # Search first so only a bounded list of fund names is sent to the browser
+            max_fund_options = 50
+            fund_search = st.text_input(
+                "Search for a fund by name",
+                key="fund_search",
+                help="Type part of a fund name to narrow the list below."
             )
             
-            # Get the selected fund details
-            selected_fund = st.session_state.filtered_selection[
-                st.session_state.filtered_selection['Name'] == fund_selector
-            ].iloc[0]
-            
-            selected_apir = selected_fund['APIR Code'] if 'APIR Code' in selected_fund else "Unknown"
-            selected_category = selected_fund['Morningstar Category'] if 'Morningstar Category' in selected_fund else "Unknown"
+            fund_names = st.session_state.filtered_selection['Name']
+            if fund_search:
+                fund_names = fund_names[fund_names.str.contains(fund_search, case=False, na=False, regex=False)]
             
-            # Comments for the selected fund
-            fund_comments = st.text_area(
-                "Comments (reason for selection, allocation percentage, etc.)",
-                key="fund_comments",
-                help="Add your rationale for selecting this fund or any other notes."
-            )
-            
-            if st.button("Add to Recommended Portfolio", use_container_width=True):
-                add_to_portfolio(fund_selector, selected_apir, selected_category, fund_comments)
+            if fund_names.empty:
+                st.info("No funds match your search.")
+            else:
+                if len(fund_names) > max_fund_options:
+                    st.caption(f"Showing the first {max_fund_options} of {len(fund_names)} funds. Refine your search to see more.")
+                
+                # Form for adding a fund to the portfolio
+                fund_selector = st.selectbox(
+                    "Select a fund to add to your recommended portfolio",
+                    options=fund_names.head(max_fund_options).tolist(),
+                    key="fund_selector"
+                )
+                
+                # Get the selected fund details (first match if a name appears more than once)
+                selected_fund = get_funds_by_name(st.session_state.filtered_selection).loc[[fund_selector]].iloc[0]
+                
+                selected_apir = selected_fund['APIR Code'] if 'APIR Code' in selected_fund else "Unknown"
+                selected_category = selected_fund['Morningstar Category'] if 'Morningstar Category' in selected_fund else "Unknown"
+                
+                # Comments for the selected fund
+                fund_comments = st.text_area(
+                    "Comments (reason for selection, allocation percentage, etc.)",
+                    key="fund_comments",
+                    help="Add your rationale for selecting this fund or any other notes."
+                )
+                
+                if st.button("Add to Recommended Portfolio", use_container_width=True):
+                    add_to_portfolio(fund_selector, selected_apir, selected_category, fund_comments)
         
         # Display the filtered selection in a dataframe
         st.subheader("Filtered Investment List")
-        st.dataframe(st.session_state.filtered_selection, use_container_width=True)
+        st.dataframe(downcast_numeric_columns(st.session_state.filtered_selection), use_container_width=True)
         
         # Selection Performance Summary
         st.subheader("Selection Performance")
@@ -282,7 +304,7 @@ if st.session_state.filtered_selection is not None:
                 # Show distribution by category
                 if 'Morningstar Category' in st.session_state.filtered_selection.columns:
                     st.markdown("**Distribution by Category:**")
-                    category_counts = st.session_state.filtered_selection['Morningstar Category'].value_counts()
+                    category_counts = count_by_category(st.session_state.filtered_selection)
                     st.dataframe(category_counts.head(10), use_container_width=True)
             else:
                 st.info("Performance metrics are not available for the filtered selection.")
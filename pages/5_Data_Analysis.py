@@ -1,15 +1,28 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 from utils.visualization import (
     create_asset_class_chart, 
     create_risk_return_scatter,
     create_fee_distribution_chart,
     create_performance_risk_chart,
-    create_category_comparison_chart,
+    create_category_comparison_charts,
     create_portfolio_comparison_chart,
     create_multi_metric_comparison_chart
 )
+from utils.data_processor import calculate_asset_class_averages, convert_categorical_columns, downcast_numeric_columns, get_column_order
+from utils.data_storage import dataframe_to_csv_bytes
+
+# Key columns shown first in the analysis table
+ANALYSIS_COLUMN_ORDER = ('Select', 'Composite Score', 'Name', 'APIR Code', 'Morningstar Category', '3 Years Annualised (%)', 
+                         'Investment Management Fee(%)', '3 Year Beta', '3 Year Standard Deviation', 
+                         '3 Year Sharpe Ratio')
+
+# Key metrics charted by category and for the selected portfolio
+KEY_METRICS = ['3 Years Annualised (%)', 'Investment Management Fee(%)', 
+               '3 Year Beta', '3 Year Standard Deviation', '3 Year Sharpe Ratio']
+
+# Rows shown per page in the fund selection editors
+EDITOR_ROWS_PER_PAGE = 250
 
 # Set page configuration
 st.set_page_config(
@@ -62,12 +75,113 @@ def add_to_portfolio(fund_name, fund_apir, fund_category, comments):
         st.success(f"Added {fund_name} to your recommended portfolio")
     else:
         st.info(f"{fund_name} is already in your recommended portfolio")
+
+# Function to calculate category averages for all numerical columns, cached per dataset
+@st.cache_data
+def get_category_averages(df):
+    category_averages = calculate_asset_class_averages(df)
+    if category_averages is None:
+        return None
     
-# Ensure the dataframe displays the specified columns first
-if display_data is not None and not display_data.empty:
-    st.markdown("### Investment Data Table")
-    st.write("Check the boxes in the 'Select' column to add funds to your recommended portfolio.")
+    # Remove non-investment data columns and round for display
+    exclude_cols = ['Select', 'Composite Score']  # Add any other columns to exclude
+    return category_averages.drop(columns=exclude_cols, errors='ignore').round(2)
+    
+# Function to mark funds in the top quartile of their category by 3-year return
+def calculate_top_quartile_by_category(df):
+    if '3 Years Annualised (%)' not in df.columns or 'Morningstar Category' not in df.columns:
+        return df
+    
+    df_styled = df.copy()
+    
+    # Calculate the 75th percentile (top quartile) of each fund's category, ignoring NaN values
+    top_quartile_threshold = df.groupby('Morningstar Category', observed=True)['3 Years Annualised (%)'].transform('quantile', 0.75)
+    
+    # Add visual indicator to fund names for top quartile
+    mask = df['3 Years Annualised (%)'] >= top_quartile_threshold
+    df_styled.loc[mask, 'Name'] = '🟢 ' + df_styled.loc[mask, 'Name'].astype(str)
+    
+    return df_styled
+
+# Function to build the analysis table (derived columns, column order, top quartile marks), cached per dataset
+@st.cache_data
+def build_analysis_table(df, desired_order):
+    table = df.copy()
     
+    # Calculate category averages from the CURRENT filtered dataset, not the original full dataset
+    current_data_averages = None
+    if df is not None and not df.empty:
+        # Calculate averages from the currently displayed data
+        avg_fields = ['3 Year Beta', '3 Year Standard Deviation', '3 Year Sharpe Ratio']
+        existing_fields = [f for f in avg_fields if f in df.columns]
+        if existing_fields and 'Morningstar Category' in df.columns:
+            current_data_averages = df.groupby('Morningstar Category', observed=True)[existing_fields].mean()
+    
+    # Look up each fund's category averages in one pass, aligned to the fund rows
+    if current_data_averages is not None:
+        fund_category_averages = current_data_averages.reindex(table['Morningstar Category']).set_axis(table.index)
+    
+    # Add a new column that calculates category avg 3 Year Beta minus fund's 3 Year Beta
+    if current_data_averages is not None and '3 Year Beta' in current_data_averages.columns and '3 Year Beta' in table.columns:
+        table['Category Avg Beta - Fund Beta'] = fund_category_averages['3 Year Beta'] - table['3 Year Beta']
+    
+    # Add a new column that calculates fund's 3 Year Sharpe Ratio minus category avg 3 Year Sharpe Ratio
+    if current_data_averages is not None and '3 Year Sharpe Ratio' in current_data_averages.columns and '3 Year Sharpe Ratio' in table.columns:
+        table['Fund Sharpe - Category Avg Sharpe'] = table['3 Year Sharpe Ratio'] - fund_category_averages['3 Year Sharpe Ratio']
+    
+    # Add a new column that calculates fund's 3 Year Standard Deviation minus category avg 3 Year Standard Deviation
+    if current_data_averages is not None and '3 Year Standard Deviation' in current_data_averages.columns and '3 Year Standard Deviation' in table.columns:
+        table['Fund StdDev - Category Avg StdDev'] = table['3 Year Standard Deviation'] - fund_category_averages['3 Year Standard Deviation']
+    
+    # Add composite score calculation
+    if all(col in table.columns for col in ['Category Avg Beta - Fund Beta', 'Fund Sharpe - Category Avg Sharpe', 'Fund StdDev - Category Avg StdDev']):
+        # Calculate composite score: (-(Fund StdDev-Category Avg StdDev)/10)+(Fund Sharpe-Category Avg Sharpe)+(Category Avg Beta-Fund Beta)
+        # Funds missing any of the three differences get NaN
+        table['Composite Score'] = (
+            (-table['Fund StdDev - Category Avg StdDev'] / 10)
+            + table['Fund Sharpe - Category Avg Sharpe']
+            + table['Category Avg Beta - Fund Beta']
+        )
+    
+    # Reorder the dataframe with the key columns first
+    table = table[get_column_order(table.columns, desired_order)]
+    
+    # Add top quartile marking
+    table = calculate_top_quartile_by_category(table)
+    
+    # Sort by Composite Score (high to low) if it exists
+    if 'Composite Score' in table.columns:
+        table = table.sort_values('Composite Score', ascending=False, na_position='last')
+    
+    return table
+    
+# Function to render one page of a fund selection editor, so the browser only renders one slice at a time
+def paginated_data_editor(df, column_config, key):
+    page_count = max(1, -(-len(df) // EDITOR_ROWS_PER_PAGE))
+    page = 1
+    if page_count > 1:
+        page = st.number_input(
+            f"Page (of {page_count})",
+            min_value=1,
+            max_value=page_count,
+            value=1,
+            step=1,
+            key=f"{key}_page",
+        )
+    page_start = (page - 1) * EDITOR_ROWS_PER_PAGE
+    
+    # Key the editor by page so row edits are never replayed onto another page
+    return st.data_editor(
+        df.iloc[page_start:page_start + EDITOR_ROWS_PER_PAGE],
+        column_config=column_config,
+        use_container_width=True,
+        hide_index=True,
+        key=f"{key}_{page}",
+    )
+
+# Function to render the fund selection editors, rerun on its own (st.fragment) when a checkbox changes
+@st.fragment
+def portfolio_selector(analysis_df, data_status):
     # Create a comments field
     if 'portfolio_comments' not in st.session_state:
         st.session_state.portfolio_comments = {}
@@ -87,146 +201,37 @@ if display_data is not None and not display_data.empty:
         if st.button("Unselect All", use_container_width=True):
             # Clear the recommended portfolio
             st.session_state.recommended_portfolio = {}
-            st.rerun()  # Rerun the app to refresh the table
+            # The editors below are built after this point, so they render from the cleared portfolio without a rerun.
+            # Their Select column data changes, which gives each editor a new element ID and discards its old checkbox edits
             
     with col3:
         # Show number of currently selected items
         num_selected = len(st.session_state.recommended_portfolio)
         st.markdown(f"**Selected: {num_selected}**")
     
-    # Create a dataframe with a selection column
-    # First, create a copy of the display data
-    selection_df = display_data.copy()
+    # Filter to only include columns that exist in the dataframe
+    available_columns = [col for col in ANALYSIS_COLUMN_ORDER if col in analysis_df.columns]
+    
+    # Only send the key columns and the category comparison columns to the data editors
+    comparison_columns = ['Category Avg Beta - Fund Beta', 'Fund Sharpe - Category Avg Sharpe', 'Fund StdDev - Category Avg StdDev']
+    editor_columns = available_columns + [col for col in comparison_columns if col in analysis_df.columns]
+
+    # Downcast numbers and encode text categories to shrink the table sent to the browser
+    display_df = downcast_numeric_columns(analysis_df[editor_columns])
+    display_df = convert_categorical_columns(display_df)
     
     # Add a new "Select" column at the beginning
     # Initialize with whether the fund is already in the portfolio
-    selection_df.insert(
+    display_df.insert(
         0, 
         "Select", 
-        selection_df['APIR Code'].apply(lambda x: x in st.session_state.recommended_portfolio)
+        display_df['APIR Code'].isin(st.session_state.recommended_portfolio).to_numpy()
     )
     
-    # Calculate category averages from the CURRENT filtered dataset, not the original full dataset
-    current_data_averages = None
-    if display_data is not None and not display_data.empty:
-        # Calculate averages from the currently displayed data
-        avg_fields = ['3 Year Beta', '3 Year Standard Deviation', '3 Year Sharpe Ratio']
-        existing_fields = [f for f in avg_fields if f in display_data.columns]
-        if existing_fields and 'Morningstar Category' in display_data.columns:
-            subset_for_avg = display_data[['Morningstar Category'] + existing_fields].copy()
-            current_data_averages = subset_for_avg.groupby('Morningstar Category').mean(numeric_only=True)
-    
-    # Add a new column that calculates category avg 3 Year Beta minus fund's 3 Year Beta
-    if current_data_averages is not None and '3 Year Beta' in current_data_averages.columns and '3 Year Beta' in selection_df.columns:
-        def calc_beta_diff(row):
-            if pd.isna(row['3 Year Beta']) or pd.isna(row['Morningstar Category']):
-                return np.nan
-            category = row['Morningstar Category']
-            if category in current_data_averages.index:
-                category_avg = current_data_averages.loc[category, '3 Year Beta']
-                return category_avg - row['3 Year Beta']
-            return np.nan
-        
-        selection_df['Category Avg Beta - Fund Beta'] = selection_df.apply(calc_beta_diff, axis=1)
-    
-    # Add a new column that calculates fund's 3 Year Sharpe Ratio minus category avg 3 Year Sharpe Ratio
-    if current_data_averages is not None and '3 Year Sharpe Ratio' in current_data_averages.columns and '3 Year Sharpe Ratio' in selection_df.columns:
-        def calc_sharpe_diff(row):
-            if pd.isna(row['3 Year Sharpe Ratio']) or pd.isna(row['Morningstar Category']):
-                return np.nan
-            category = row['Morningstar Category']
-            if category in current_data_averages.index:
-                category_avg = current_data_averages.loc[category, '3 Year Sharpe Ratio']
-                return row['3 Year Sharpe Ratio'] - category_avg
-            return np.nan
-        
-        selection_df['Fund Sharpe - Category Avg Sharpe'] = selection_df.apply(calc_sharpe_diff, axis=1)
-    
-    # Add a new column that calculates fund's 3 Year Standard Deviation minus category avg 3 Year Standard Deviation
-    if current_data_averages is not None and '3 Year Standard Deviation' in current_data_averages.columns and '3 Year Standard Deviation' in selection_df.columns:
-        def calc_stdev_diff(row):
-            if pd.isna(row['3 Year Standard Deviation']) or pd.isna(row['Morningstar Category']):
-                return np.nan
-            category = row['Morningstar Category']
-            if category in current_data_averages.index:
-                category_avg = current_data_averages.loc[category, '3 Year Standard Deviation']
-                return row['3 Year Standard Deviation'] - category_avg
-            return np.nan
-        
-        selection_df['Fund StdDev - Category Avg StdDev'] = selection_df.apply(calc_stdev_diff, axis=1)
-    
-    # Add composite score calculation
-    if all(col in selection_df.columns for col in ['Category Avg Beta - Fund Beta', 'Fund Sharpe - Category Avg Sharpe', 'Fund StdDev - Category Avg StdDev']):
-        def calc_composite_score(row):
-            beta_diff = row['Category Avg Beta - Fund Beta']
-            sharpe_diff = row['Fund Sharpe - Category Avg Sharpe']
-            stdev_diff = row['Fund StdDev - Category Avg StdDev']
-            
-            # Check for NaN values
-            if pd.isna(beta_diff) or pd.isna(sharpe_diff) or pd.isna(stdev_diff):
-                return np.nan
-            
-            # Calculate composite score: (-(Fund StdDev-Category Avg StdDev)/10)+(Fund Sharpe-Category Avg Sharpe)+(Category Avg Beta-Fund Beta)
-            composite_score = (-stdev_diff / 10) + sharpe_diff + beta_diff
-            
-            return composite_score
-        
-        selection_df['Composite Score'] = selection_df.apply(calc_composite_score, axis=1)
-    
-    # Reorder columns to place key columns first
-    desired_order = ['Select', 'Composite Score', 'Name', 'APIR Code', 'Morningstar Category', '3 Years Annualised (%)', 
-                    'Investment Management Fee(%)', '3 Year Beta', '3 Year Standard Deviation', 
-                    '3 Year Sharpe Ratio']
-    
-    # Filter to only include columns that exist in the dataframe
-    available_columns = [col for col in desired_order if col in selection_df.columns]
-    
-    # Get remaining columns not in the desired order
-    remaining_columns = [col for col in selection_df.columns if col not in available_columns]
-    
-    # Combine the lists
-    final_column_order = available_columns + remaining_columns
-    
-    # Reorder the dataframe
-    reordered_df = selection_df[final_column_order]
-    
-    # Add top quartile highlighting function
-    def calculate_top_quartile_by_category(df):
-        if '3 Years Annualised (%)' not in df.columns or 'Morningstar Category' not in df.columns:
-            return df
-        
-        df_styled = df.copy()
-        
-        # Calculate top quartile threshold for each category
-        for category in df['Morningstar Category'].unique():
-            if pd.isna(category):
-                continue
-                
-            category_data = df[df['Morningstar Category'] == category]
-            returns_col = category_data['3 Years Annualised (%)']
-            
-            # Remove NaN values and calculate 75th percentile (top quartile)
-            valid_returns = returns_col.dropna()
-            if len(valid_returns) > 0:
-                top_quartile_threshold = valid_returns.quantile(0.75)
-                
-                # Add visual indicator to fund names for top quartile
-                mask = (df['Morningstar Category'] == category) & (df['3 Years Annualised (%)'] >= top_quartile_threshold)
-                df_styled.loc[mask, 'Name'] = '🟢 ' + df_styled.loc[mask, 'Name'].astype(str)
-        
-        return df_styled
-    
-    # Add top quartile marking
-    reordered_df = calculate_top_quartile_by_category(reordered_df)
-    
-    # Sort by Composite Score (high to low) if it exists
-    if 'Composite Score' in reordered_df.columns:
-        reordered_df = reordered_df.sort_values('Composite Score', ascending=False, na_position='last')
-    
     # Group by Morningstar Category
-    if 'Morningstar Category' in reordered_df.columns:
+    if 'Morningstar Category' in analysis_df.columns:
         # Get unique categories and sort them alphabetically
-        categories = sorted(reordered_df['Morningstar Category'].dropna().unique())
+        categories = sorted(analysis_df['Morningstar Category'].dropna().unique())
         
         # Create tabs for "All" and individual categories
         category_tabs = ["All Categories"] + list(categories)
@@ -244,23 +249,21 @@ if display_data is not None and not display_data.empty:
             }
             
             # Show info about top quartile highlighting
-            if '3 Years Annualised (%)' in reordered_df.columns:
+            if '3 Years Annualised (%)' in analysis_df.columns:
                 st.info("🟢 Funds with 3-year returns in the top quartile for their category are marked with a green dot")
             
-            display_df = reordered_df
-            
-            edited_df = st.data_editor(
-                display_df,
-                column_config=column_config,
-                use_container_width=True,
-                hide_index=True,
-            )
-        
+            # Page through large tables so the browser only renders one slice at a time
+            page_edited_df = paginated_data_editor(display_df, column_config, "editor_all")
+
+            # Rows outside the current page keep their current selection state
+            edited_df = display_df.copy()
+            edited_df.loc[page_edited_df.index, 'Select'] = page_edited_df['Select']
+
         # Individual category tabs
         for i, category in enumerate(categories):
             with tabs[i+1]:
                 # Filter dataframe for this category
-                category_df = reordered_df[reordered_df['Morningstar Category'] == category].copy()
+                category_df = display_df[display_df['Morningstar Category'] == category].copy()
                 
                 # Only show if there's data for this category
                 if not category_df.empty:
@@ -273,63 +276,61 @@ if display_data is not None and not display_data.empty:
                         if top_quartile_count > 0:
                             st.info(f"🟢 {top_quartile_count} funds in this category have 3-year returns in the top quartile")
                     
-                    # Display editable dataframe for this category
-                    cat_edited_df = st.data_editor(
-                        category_df,
-                        column_config={
-                            "Select": st.column_config.CheckboxColumn(
-                                "Select",
-                                help="Check to add to portfolio",
-                                default=False,
-                            )
-                        },
-                        use_container_width=True,
-                        hide_index=True,
-                    )
+                    # Display editable dataframe for this category, paged like the All tab
+                    cat_edited_df = paginated_data_editor(category_df, column_config, f"editor_{category}")
                     
                     # Merge edited values back to the main edited_df
-                    for idx, row in cat_edited_df.iterrows():
-                        if idx in edited_df.index:
-                            edited_df.loc[idx, 'Select'] = row['Select']
+                    common_idx = cat_edited_df.index.intersection(edited_df.index)
+                    edited_df.loc[common_idx, 'Select'] = cat_edited_df.loc[common_idx, 'Select']
                 else:
                     st.info(f"No investments in the {category} category")
     else:
-        # If no category column, just display the regular table
-        edited_df = st.data_editor(
-            reordered_df,
-            column_config={
+        # If no category column, just display the regular table, paged the same way
+        page_edited_df = paginated_data_editor(
+            display_df,
+            {
                 "Select": st.column_config.CheckboxColumn(
                     "Select",
                     help="Check to add to portfolio",
                     default=False,
                 )
             },
-            use_container_width=True,
-            hide_index=True,
+            "editor_all",
         )
+        edited_df = display_df.copy()
+        edited_df.loc[page_edited_df.index, 'Select'] = page_edited_df['Select']
     
     # Process the edited dataframe
     changed_rows = []
     
-    # Get newly selected funds
-    for idx, row in edited_df.iterrows():
-        fund_name = row['Name']
-        # Remove green dot prefix if present for consistent processing
-        clean_fund_name = str(fund_name).replace('🟢 ', '') if str(fund_name).startswith('🟢 ') else fund_name
-        fund_apir = row['APIR Code']
-        fund_category = row['Morningstar Category'] if 'Morningstar Category' in row else "Unknown"
-        is_selected = row['Select']
-        is_in_portfolio = fund_apir in st.session_state.recommended_portfolio
+    # Skip reconciliation when the selections are unchanged since the last run
+    selection_hash = int(pd.util.hash_pandas_object(edited_df[['APIR Code', 'Select']], index=False).sum())
+    if selection_hash != st.session_state.get('last_selection_hash'):
+        # Only visit rows whose selection differs from the current portfolio
+        in_portfolio = edited_df['APIR Code'].isin(st.session_state.recommended_portfolio)
+        changed_mask = edited_df['Select'].astype(bool) != in_portfolio
         
-        # Check if selection status changed
-        if is_selected and not is_in_portfolio:
-            # Add to portfolio using clean name
-            add_to_portfolio(clean_fund_name, fund_apir, fund_category, comment_input)
-            changed_rows.append(clean_fund_name)
-        elif not is_selected and is_in_portfolio:
-            # Remove from portfolio
-            del st.session_state.recommended_portfolio[fund_apir]
-            changed_rows.append(clean_fund_name)
+        # Get newly selected and deselected funds
+        for idx, row in edited_df[changed_mask].iterrows():
+            fund_name = row['Name']
+            # Remove green dot prefix if present for consistent processing
+            clean_fund_name = str(fund_name).replace('🟢 ', '') if str(fund_name).startswith('🟢 ') else fund_name
+            fund_apir = row['APIR Code']
+            fund_category = row['Morningstar Category'] if 'Morningstar Category' in row else "Unknown"
+            is_selected = row['Select']
+            is_in_portfolio = fund_apir in st.session_state.recommended_portfolio
+        
+            # Check if selection status changed
+            if is_selected and not is_in_portfolio:
+                # Add to portfolio using clean name
+                add_to_portfolio(clean_fund_name, fund_apir, fund_category, comment_input)
+                changed_rows.append(clean_fund_name)
+            elif not is_selected and is_in_portfolio:
+                # Remove from portfolio
+                del st.session_state.recommended_portfolio[fund_apir]
+                changed_rows.append(clean_fund_name)
+        
+        st.session_state['last_selection_hash'] = selection_hash
     
     # Show portfolio status
     if st.session_state.recommended_portfolio:
@@ -341,40 +342,57 @@ if display_data is not None and not display_data.empty:
             
         st.info("Go to the **Recommended Portfolio** page to view and manage your selections.")
     
-    # Export data
-    csv_data = reordered_df.to_csv(index=False)
-    st.download_button(
-        label=f"Download {data_status}",
-        data=csv_data,
-        file_name="investment_data.csv",
-        mime="text/csv",
-    )
+    # Export data, including the current selection state
+    # The CSV changes with every selection, so only encode it when an export is requested
+    if st.checkbox(f"Prepare {data_status} for download", key="prepare_analysis_export"):
+        export_df = pd.concat([display_df['Select'], analysis_df], axis=1)
+        csv_data = dataframe_to_csv_bytes(export_df)
+        st.download_button(
+            label=f"Download {data_status}",
+            data=csv_data,
+            file_name="investment_data.csv",
+            mime="text/csv",
+        )
+    
+    # Selected vs All comparison, redrawn with the selection
+    available_key_metrics = [col for col in KEY_METRICS if col in analysis_df.columns]
+    if st.session_state.recommended_portfolio and available_key_metrics and 'Morningstar Category' in analysis_df.columns:
+        selected_funds = analysis_df[analysis_df['APIR Code'].isin(st.session_state.recommended_portfolio)]
+        
+        if not selected_funds.empty:
+            st.subheader("Selected Portfolio vs All Funds")
+            fig_comparison = create_portfolio_comparison_chart(analysis_df, selected_funds, available_key_metrics)
+            st.plotly_chart(fig_comparison, use_container_width=True)
+
+# Ensure the dataframe displays the specified columns first
+if display_data is not None and not display_data.empty:
+    st.markdown("### Investment Data Table")
+    st.write("Check the boxes in the 'Select' column to add funds to your recommended portfolio.")
+    
+    # Build the derived table once per dataset; reruns reuse the cached result
+    reordered_df = build_analysis_table(display_data, ANALYSIS_COLUMN_ORDER)
+    
+    # Selection editors, portfolio status and export
+    portfolio_selector(reordered_df, data_status)
     
     # Additional Analysis Section
     st.header("Additional Analysis")
     
     # Category averages table for all numerical columns
     st.subheader("Category Averages - All Numerical Columns")
+    numerical_cols = []
     if not reordered_df.empty and 'Morningstar Category' in reordered_df.columns:
-        # Get all numerical columns from the data
-        numerical_cols = reordered_df.select_dtypes(include=[np.number]).columns.tolist()
-        
-        # Remove non-investment data columns if they exist
-        exclude_cols = ['Select', 'Composite Score']  # Add any other columns to exclude
-        numerical_cols = [col for col in numerical_cols if col not in exclude_cols]
+        # Calculate averages by category for all numerical columns in a single groupby
+        category_averages = get_category_averages(reordered_df)
+        if category_averages is not None:
+            numerical_cols = category_averages.columns.tolist()
         
         if numerical_cols:
-            # Calculate averages by category
-            category_averages = reordered_df.groupby('Morningstar Category')[numerical_cols].mean()
-            
-            # Round to 2 decimal places for better display
-            category_averages = category_averages.round(2)
-            
             # Display the table
-            st.dataframe(category_averages, use_container_width=True)
+            st.dataframe(downcast_numeric_columns(category_averages), use_container_width=True)
             
             # Download category averages
-            category_csv = category_averages.to_csv()
+            category_csv = dataframe_to_csv_bytes(category_averages, index=True)
             st.download_button(
                 label="Download Category Averages",
                 data=category_csv,
@@ -390,38 +408,19 @@ if display_data is not None and not display_data.empty:
     st.subheader("Category Comparison Charts")
     
     if not reordered_df.empty and numerical_cols and 'Morningstar Category' in reordered_df.columns:
-        # Create visualizations for key metrics
-        key_metrics = ['3 Years Annualised (%)', 'Investment Management Fee(%)', 
-                      '3 Year Beta', '3 Year Standard Deviation', '3 Year Sharpe Ratio']
-        
         # Filter to available key metrics
-        available_key_metrics = [col for col in key_metrics if col in numerical_cols]
+        available_key_metrics = [col for col in KEY_METRICS if col in numerical_cols]
         
         if available_key_metrics:
-            # Create multiple bar charts in a grid layout
-            cols = st.columns(2)
-            
-            for i, metric in enumerate(available_key_metrics):
-                with cols[i % 2]:
-                    # Create individual bar chart for each metric
-                    fig_metric = create_category_comparison_chart(reordered_df, [metric])
-                    st.plotly_chart(fig_metric, use_container_width=True)
+            # Create one bar chart per metric in a grid layout from the precomputed averages
+            fig_metrics = create_category_comparison_charts(category_averages, available_key_metrics)
+            st.plotly_chart(fig_metrics, use_container_width=True)
             
             # Create a comprehensive comparison chart with multiple metrics
             if len(available_key_metrics) > 1:
                 st.subheader("Multi-Metric Category Comparison")
                 fig_multi = create_multi_metric_comparison_chart(category_averages, available_key_metrics)
                 st.plotly_chart(fig_multi, use_container_width=True)
-        
-        # Selected vs All comparison
-        if st.session_state.recommended_portfolio and len(st.session_state.recommended_portfolio) > 0:
-            st.subheader("Selected Portfolio vs All Funds")
-            selected_apirs = list(st.session_state.recommended_portfolio.keys())
-            selected_funds = reordered_df[reordered_df['APIR Code'].isin(selected_apirs)]
-            
-            if not selected_funds.empty and available_key_metrics:
-                fig_comparison = create_portfolio_comparison_chart(reordered_df, selected_funds, available_key_metrics)
-                st.plotly_chart(fig_comparison, use_container_width=True)
     else:
         st.info("No numerical data or category data available for visualization")
 else:
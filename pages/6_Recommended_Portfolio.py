@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import io
+from utils.data_processor import DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING, get_column_order
+from utils.data_storage import dataframe_to_csv_bytes, dataframe_to_parquet_bytes
 
 # Set page configuration
 st.set_page_config(
@@ -28,34 +30,441 @@ if 'asset_class_mapping' not in st.session_state:
 
 st.title("Recommended Portfolio")
 
+# Asset class options, fixed for the life of the app
+ASSET_CLASSES = (
+    'Cash', 
+    'Australian Fixed Interest', 
+    'International Fixed Interest', 
+    'Australian Equities', 
+    'International Equities', 
+    'Property', 
+    'Alternatives'
+)
+
+# Columns stored for each fund in the recommended portfolio
+PORTFOLIO_COLUMNS = ['Name', 'APIR Code', 'Morningstar Category', 'Comments']
+
+# Fund metrics combined into allocation-weighted portfolio metrics
+PORTFOLIO_METRIC_COLUMNS = ['3 Years Annualised (%)', '3 Year Standard Deviation', '3 Year Beta', 
+                            '3 Year Sharpe Ratio', 'Investment Management Fee(%)']
+
+# Function to build the portfolio DataFrame, cached until the portfolio contents change
+@st.cache_data(show_spinner=False)
+def build_portfolio_dataframe(portfolio_records):
+    # Convert the fund records to a DataFrame with a fixed schema, only blank comments are filled
+    return pd.DataFrame.from_records(
+        [dict(record) for record in portfolio_records], columns=PORTFOLIO_COLUMNS
+    ).fillna({'Comments': ""})
+
 # Function to convert the portfolio dictionary to a DataFrame
 def portfolio_to_dataframe():
     if not st.session_state.recommended_portfolio:
         return None
     
-    # Convert dictionary to DataFrame
-    portfolio_data = list(st.session_state.recommended_portfolio.values())
-    portfolio_df = pd.DataFrame(portfolio_data)
+    # Hashable snapshot of the portfolio so reruns with an unchanged portfolio reuse the cached DataFrame
+    portfolio_records = tuple(tuple(fund.items()) for fund in st.session_state.recommended_portfolio.values())
+    return build_portfolio_dataframe(portfolio_records)
+
+# Function to remove funds from the portfolio
+def remove_from_portfolio(apir_codes):
+    for apir_code in apir_codes:
+        if apir_code in st.session_state.recommended_portfolio:
+            fund_name = st.session_state.recommended_portfolio[apir_code]['Name']
+            del st.session_state.recommended_portfolio[apir_code]
+            # Also remove the allocation
+            if apir_code in st.session_state.portfolio_allocations:
+                del st.session_state.portfolio_allocations[apir_code]
+            st.session_state.asset_class_mapping.pop(apir_code, None)
+            st.toast(f"Removed {fund_name} from your recommended portfolio")
+    # Reset the allocation editor and removal widgets, their row edits refer to the old fund list
+    for key in ['allocation_editor', 'funds_to_remove']:
+        if key in st.session_state:
+            del st.session_state[key]
+
+# Function to save the cells changed in the allocation editor to session state
+def save_allocation_edits(apir_codes):
+    # Edited rows are keyed by row position in the allocation table
+    for row, changes in st.session_state.allocation_editor['edited_rows'].items():
+        apir = apir_codes[int(row)]
+        if 'Allocation %' in changes:
+            allocation = changes['Allocation %']
+            st.session_state.portfolio_allocations[apir] = float(allocation) if allocation is not None else np.nan
+        if 'Asset Class' in changes:
+            st.session_state.asset_class_mapping[apir] = changes['Asset Class']
+
+# Function to get the fund allocations as percentages indexed by APIR Code (NaN when not set)
+def get_allocation_series():
+    return pd.Series(st.session_state.portfolio_allocations, dtype='float64')
+
+# Function to get each fund's asset class: the user's override if chosen, otherwise the mapped Morningstar category
+def get_fund_asset_classes(fund_categories, asset_class_overrides, category_mapping):
+    # Categories map through the live Assumptions page mapping, default to Cash if category not found
+    mapped = fund_categories.astype(object).map(category_mapping).fillna('Cash')
+    overrides = pd.Series(fund_categories.index.map(asset_class_overrides), index=fund_categories.index, dtype=object)
+    return overrides.where(overrides.notna(), mapped)
+
+# Function to total the fund allocations per asset class for the portfolio funds found in the detailed data
+def calculate_asset_class_allocations(detailed_portfolio, allocation_series, portfolio_apirs, asset_class_overrides, category_mapping):
+    fund_categories = detailed_portfolio.drop_duplicates('APIR Code').set_index('APIR Code')['Morningstar Category']
+    fund_categories = fund_categories[fund_categories.index.isin(portfolio_apirs)]
+    fund_asset_classes = get_fund_asset_classes(fund_categories, asset_class_overrides, category_mapping)
+    
+    # Total the allocations per asset class in one groupby
+    allocations = allocation_series.reindex(fund_asset_classes.index).fillna(0.0)
+    return allocations.groupby(fund_asset_classes).sum().reindex(ASSET_CLASSES, fill_value=0.0)
+
+# Function to fingerprint a session state dataset by its shape, columns and APIR Codes, a cheap cache key instead of hashing every column
+def get_data_fingerprint(data_key):
+    df = st.session_state.get(data_key)
+    if df is None or df.empty:
+        return None
+    
+    # Datasets are replaced rather than changed in place, so each DataFrame is only fingerprinted once
+    fingerprints = st.session_state.setdefault('data_fingerprints', {})
+    if data_key not in fingerprints or fingerprints[data_key][0] is not df:
+        fingerprint = df.shape, tuple(df.columns), int(pd.util.hash_pandas_object(df['APIR Code'], index=False).sum())
+        fingerprints[data_key] = (df, fingerprint)
+    return fingerprints[data_key][1]
+
+# Function to index the combined data by APIR Code, cached per dataset fingerprint (the frame itself is not hashed)
+@st.cache_data(show_spinner=False)
+def get_apir_indexed_data(_combined_data, data_fingerprint):
+    return _combined_data.set_index('APIR Code', drop=False)
+
+# Function to get the detailed data rows for the portfolio funds, cached per dataset fingerprint and fund list
+@st.cache_data(show_spinner=False)
+def get_portfolio_slice(_combined_data, data_fingerprint, portfolio_apirs):
+    apir_indexed = get_apir_indexed_data(_combined_data, data_fingerprint)
+    # Hash lookups on the APIR index instead of a full-column scan
+    return apir_indexed.loc[apir_indexed.index.intersection(portfolio_apirs)].reset_index(drop=True)
+
+# Function to calculate allocation-weighted portfolio metrics in one vectorized pass
+def calculate_weighted_metrics(detailed_portfolio, allocation_series, portfolio_apirs):
+    # Allocation weights as decimals, skipping funds without a numeric allocation
+    weights = allocation_series.dropna() / 100.0
+    
+    # Align weights with the first data row of each portfolio fund
+    fund_data = detailed_portfolio.drop_duplicates('APIR Code').set_index('APIR Code')
+    weights = weights[weights.index.isin(fund_data.index) & weights.index.isin(portfolio_apirs)]
+    
+    # Missing metrics and NaN values contribute nothing to the weighted sums
+    metric_values = fund_data.reindex(index=weights.index, columns=PORTFOLIO_METRIC_COLUMNS).to_numpy(dtype='float64')
+    weighted_metrics = pd.Series(np.nan_to_num(metric_values).T @ weights.to_numpy(), index=PORTFOLIO_METRIC_COLUMNS)
+    
+    return weighted_metrics, float(weights.sum())
+
+# Function to render the detailed report, rerunning only this fragment when the button is clicked
+@st.fragment
+def detailed_report(detailed_portfolio):
+    # Initialize session state for the detailed report
+    if 'show_detailed_report' not in st.session_state:
+        st.session_state.show_detailed_report = False
+    
+    # Remember the click, so changing the file format below does not hide the report
+    if st.button("Generate Detailed Portfolio Report"):
+        st.session_state.show_detailed_report = True
+    
+    if st.session_state.show_detailed_report:
+        st.subheader("Detailed Portfolio Report")
+        
+        # Use the full details for each fund from the main data
+        if detailed_portfolio is not None:
+            if not detailed_portfolio.empty:
+                # Display the detailed portfolio data
+                st.dataframe(detailed_portfolio, use_container_width=True)
+                
+                # Build only the chosen file format, Parquet is smaller and faster to write for wide data
+                report_format = st.radio("Detailed report format", ["CSV", "Parquet"], horizontal=True, key="detailed_report_format")
+                
+                # Export detailed portfolio in the chosen format
+                if report_format == "Parquet":
+                    try:
+                        parquet_detailed = dataframe_to_parquet_bytes(detailed_portfolio)
+                        st.download_button(
+                            label="Download Detailed Portfolio Report",
+                            data=parquet_detailed,
+                            file_name="recommended_portfolio_detailed.parquet",
+                            mime="application/octet-stream",
+                        )
+                    except Exception as e:
+                        st.error(f"Error creating Parquet file: {str(e)}")
+                else:
+                    csv_detailed = dataframe_to_csv_bytes(detailed_portfolio)
+                    st.download_button(
+                        label="Download Detailed Portfolio Report",
+                        data=csv_detailed,
+                        file_name="recommended_portfolio_detailed.csv",
+                        mime="text/csv",
+                    )
+            else:
+                st.warning("Could not retrieve detailed information for the selected funds.")
+
+# Function to build the Excel report, cached until the data fingerprints, portfolio or allocations change
+# (the overview and detailed frames are not hashed, the fingerprints stand in for them)
+@st.cache_data(show_spinner=False)
+def build_portfolio_report(_overview_data, overview_fingerprint, overview_sheet_name, portfolio_df,
+                           _detailed_portfolio, data_fingerprint, portfolio_apirs,
+                           allocation_items, asset_class_override_items, category_mapping_items, strategic_asset_allocation):
+    allocation_series = pd.Series(dict(allocation_items), dtype='float64')
+    asset_class_overrides = dict(asset_class_override_items)
+    category_mapping = dict(category_mapping_items)
+    
+    # Create an Excel file with multiple sheets
+    output = io.BytesIO()
+    
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # Sheet 1: All Formula Filtered Data, or all combined data when nothing is filtered
+        if _overview_data is not None:
+            _overview_data.to_excel(writer, sheet_name=overview_sheet_name, index=False)
+        
+        # Sheet 2: Portfolio Analysis
+        
+        # Add portfolio funds with allocations
+        portfolio_with_allocations = portfolio_df.assign(**{'Allocation %': portfolio_df['APIR Code'].map(allocation_series)})
+        
+        # Use the detailed fund information for portfolio
+        if _detailed_portfolio is not None:
+            if not _detailed_portfolio.empty:
+                # Add allocations and asset classes to the detailed data in one pass, without intermediate copies
+                detailed_with_allocations = _detailed_portfolio.assign(**{
+                    'Allocation %': _detailed_portfolio['APIR Code'].map(allocation_series),
+                    'Asset Class': get_fund_asset_classes(
+                        _detailed_portfolio.set_index('APIR Code')['Morningstar Category'], asset_class_overrides, category_mapping
+                    ).to_numpy()
+                })
+                
+                # Reorder columns: Name, Allocation %, APIR Code, then the rest
+                detailed_with_allocations = detailed_with_allocations[
+                    get_column_order(detailed_with_allocations.columns, ['Name', 'Allocation %', 'APIR Code'])
+                ]
+                
+                # Create a clean portfolio analysis sheet with separate sections
+                
+                # Section 1: Portfolio Funds with Allocations
+                detailed_with_allocations.to_excel(writer, sheet_name='Portfolio Analysis', index=False, startrow=0)
+                
+                # Get the starting row for the next section
+                current_row = len(detailed_with_allocations) + 3
+                
+                # Section 2: Portfolio Metrics
+                weighted_metrics, total_weight = calculate_weighted_metrics(_detailed_portfolio, allocation_series, portfolio_apirs)
+                weighted_return = weighted_metrics['3 Years Annualised (%)']
+                weighted_stddev = weighted_metrics['3 Year Standard Deviation']
+                weighted_beta = weighted_metrics['3 Year Beta']
+                weighted_sharpe = weighted_metrics['3 Year Sharpe Ratio']
+                weighted_mer = weighted_metrics['Investment Management Fee(%)']
+                
+                # The small summary tables are written straight to the sheet, with the same header style as to_excel
+                worksheet = writer.sheets['Portfolio Analysis']
+                header_format = writer.book.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+                
+                # Create metrics rows with clean structure
+                metrics_rows = [
+                    ['Portfolio 3Yr Return (%)', f"{weighted_return:.2f}"],
+                    ['Portfolio Standard Deviation', f"{weighted_stddev:.2f}"],
+                    ['Portfolio Beta', f"{weighted_beta:.2f}"],
+                    ['Portfolio Sharpe Ratio', f"{weighted_sharpe:.2f}"],
+                    ['Portfolio MER (%)', f"{weighted_mer:.2f}"],
+                    ['Total Portfolio Weight (%)', f"{total_weight * 100:.1f}"]
+                ]
+                
+                worksheet.write_row(current_row, 0, ['Metric', 'Value'], header_format)
+                for offset, metric_row in enumerate(metrics_rows, start=1):
+                    worksheet.write_row(current_row + offset, 0, metric_row)
+                current_row += len(metrics_rows) + 3
+                
+                # Section 3: Asset Class Allocation Analysis
+                asset_class_allocations = calculate_asset_class_allocations(
+                    _detailed_portfolio, allocation_series, portfolio_apirs, asset_class_overrides, category_mapping
+                )
+                
+                # Get target allocations
+                target_profile = "Balanced (40/60)"  # Default
+                target_allocations = {}
+                
+                if strategic_asset_allocation is not None:
+                    asset_class_names = strategic_asset_allocation['Asset Class']
+                    target_values = np.asarray(strategic_asset_allocation[target_profile], dtype='float64')
+                    
+                    asset_class_mapping = {
+                        'Cash': 'Cash',
+                        'Fixed Interest': 'Australian Fixed Interest',
+                        'International Fixed Interest': 'International Fixed Interest',
+                        'Australian Shares': 'Australian Equities',
+                        'International Shares': 'International Equities',
+                        'Property': 'Property',
+                        'Alternatives': 'Alternatives'
+                    }
+                    
+                    mapped_classes = [asset_class_mapping.get(name, name) for name in asset_class_names]
+                    target_allocations = pd.Series(target_values, index=mapped_classes).groupby(level=0, sort=False).sum().to_dict()
+                else:
+                    # Default target allocations
+                    target_allocations = {
+                        'Cash': 5, 'Australian Fixed Interest': 25, 'International Fixed Interest': 10,
+                        'Australian Equities': 28, 'International Equities': 20, 'Property': 6, 'Alternatives': 6
+                    }
+                
+                # Create allocation comparison rows from the aligned asset class Series
+                target_series = pd.Series(target_allocations, dtype='float64').reindex(ASSET_CLASSES, fill_value=0.0)
+                variance = asset_class_allocations - target_series
+                
+                worksheet.write_row(current_row, 0, ['Asset Class', 'Portfolio %', 'Target %', 'Variance'], header_format)
+                for offset, comparison_row in enumerate(zip(ASSET_CLASSES, asset_class_allocations.tolist(),
+                                                            target_series.tolist(), variance.tolist()), start=1):
+                    worksheet.write_row(current_row + offset, 0, comparison_row)
+            else:
+                # Fallback if no detailed data available
+                portfolio_with_allocations.to_excel(writer, sheet_name='Portfolio Analysis', index=False)
+        else:
+            # Fallback if no main data available
+            portfolio_with_allocations.to_excel(writer, sheet_name='Portfolio Analysis', index=False)
+    
+    # Prepare the file for download
+    return output.getvalue()
+
+# Function to render the Excel report download, rerunning only this fragment while the report is generated
+@st.fragment
+def portfolio_report(portfolio_df, detailed_portfolio, portfolio_apirs):
+    st.subheader("Download Portfolio Report")
+    
+    # Initialize session state for excel data
+    if 'excel_data' not in st.session_state:
+        st.session_state.excel_data = None
     
-    # Ensure we have the right columns, even if some data is missing
-    required_columns = ['Name', 'APIR Code', 'Morningstar Category', 'Comments']
-    for col in required_columns:
-        if col not in portfolio_df.columns:
-            portfolio_df[col] = ""
+    # Create comprehensive Excel file with multiple sheets
+    if st.button("Download Portfolio Report"):
+        with st.spinner("Generating portfolio report..."):
+            # Sheet 1 shows the formula filtered data when available, otherwise all combined data
+            overview_data_key, overview_sheet_name = None, None
+            if st.session_state.filtered_selection is not None and not st.session_state.filtered_selection.empty:
+                overview_data_key, overview_sheet_name = 'filtered_selection', 'All Formula Filtered Data'
+            elif st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
+                overview_data_key, overview_sheet_name = 'combined_data', 'All Combined Data'
+            overview_data = st.session_state[overview_data_key] if overview_data_key else None
+            overview_fingerprint = get_data_fingerprint(overview_data_key) if overview_data_key else None
+            
+            # Regenerating an unchanged report reuses the cached workbook
+            st.session_state.excel_data = build_portfolio_report(
+                overview_data, overview_fingerprint, overview_sheet_name, portfolio_df,
+                detailed_portfolio, get_data_fingerprint('combined_data'), tuple(portfolio_apirs),
+                tuple(st.session_state.portfolio_allocations.items()),
+                tuple(st.session_state.asset_class_mapping.items()),
+                tuple(st.session_state.morningstar_asset_class_mapping.items()),
+                st.session_state.get('strategic_asset_allocation')
+            )
+            
+            st.success("Portfolio report generated successfully! The Excel file contains two sheets: 'All Formula Filtered Data' and 'Portfolio Analysis'.")
+            st.rerun(scope="fragment")  # Refresh to show the download button
     
-    return portfolio_df
+    # Show download button if excel data is available
+    if st.session_state.excel_data is not None:
+        st.download_button(
+            label="📥 Download Portfolio Report (Excel)",
+            data=st.session_state.excel_data,
+            file_name="recommended_portfolio_report.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        
+        # Clear the excel data after download button is shown
+        if st.button("Generate New Report"):
+            st.session_state.excel_data = None
+            st.rerun(scope="fragment")
 
-# Function to remove a fund from the portfolio
-def remove_from_portfolio(apir_code):
-    if apir_code in st.session_state.recommended_portfolio:
-        fund_name = st.session_state.recommended_portfolio[apir_code]['Name']
-        del st.session_state.recommended_portfolio[apir_code]
-        # Also remove the allocation
-        if apir_code in st.session_state.portfolio_allocations:
-            del st.session_state.portfolio_allocations[apir_code]
-        st.success(f"Removed {fund_name} from your recommended portfolio")
-        # Rerun to update the UI
-        st.rerun()
+# Function to render the portfolio vs target allocation comparison for the selected risk profile
+@st.fragment
+def target_comparison(asset_class_allocations, total_allocated):
+    st.subheader("Portfolio vs Target Allocation")
+    
+    # Get target allocation from assumptions page (use Balanced as default)
+    target_profile = st.selectbox(
+        "Select target risk profile for comparison:",
+        ['Defensive (100/0)', 'Conservative (80/20)', 'Moderate (60/40)', 'Balanced (40/60)', 'Growth (20/80)', 'High Growth (0/100)'],
+        index=3,  # Default to Balanced
+        key="target_profile_select",
+        help="Select a risk profile to compare your portfolio allocation against the strategic target allocation"
+    )
+    
+    # Initialize session state for strategic asset allocation if not present
+    if 'strategic_asset_allocation' not in st.session_state:
+        st.session_state.strategic_asset_allocation = {
+            'Asset Class': ['Cash', 'Fixed Interest', 'International Fixed Interest', 'Australian Shares', 'International Shares', 'Property', 'Alternatives'],
+            'Type': ['Income', 'Income', 'Income', 'Growth', 'Growth', 'Income and Growth', 'Income and Growth'],
+            'Defensive (100/0)': [70, 30, 0, 0, 0, 0, 0],
+            'Conservative (80/20)': [20, 40, 20, 8, 6, 3, 3],
+            'Moderate (60/40)': [15, 30, 15, 18, 12, 5, 5],
+            'Balanced (40/60)': [5, 25, 10, 28, 20, 6, 6],
+            'Growth (20/80)': [2, 12, 6, 38, 26, 8, 8],
+            'High Growth (0/100)': [2, 0, 0, 48, 34, 8, 8]
+        }
+    
+    # Get target allocations from assumptions page
+    target_allocations = {}
+    asset_class_names = st.session_state.strategic_asset_allocation['Asset Class']
+    
+    # Get target values for the selected profile
+    if target_profile in st.session_state.strategic_asset_allocation:
+        # Read the profile's allocations once as a float array
+        target_values = np.asarray(st.session_state.strategic_asset_allocation[target_profile], dtype='float64')
+        
+        # Map assumption page asset classes to our asset classes
+        asset_class_mapping = {
+            'Cash': 'Cash',
+            'Fixed Interest': 'Australian Fixed Interest',
+            'International Fixed Interest': 'International Fixed Interest',
+            'Australian Shares': 'Australian Equities',
+            'International Shares': 'International Equities',
+            'Property': 'Property',
+            'Alternatives': 'Alternatives'
+        }
+        
+        # Build target allocations dictionary, summing classes that map to the same name
+        mapped_classes = [asset_class_mapping.get(name, name) for name in asset_class_names]
+        target_allocations = pd.Series(target_values, index=mapped_classes).groupby(level=0, sort=False).sum().to_dict()
+    else:
+        # Fallback if profile not found
+        target_allocations = {
+            'Cash': 5,
+            'Australian Fixed Interest': 25,
+            'International Fixed Interest': 10,
+            'Australian Equities': 28,
+            'International Equities': 20,
+            'Property': 6,
+            'Alternatives': 6
+        }
+    
+    # Display current profile being compared
+    st.info(f"Comparing against **{target_profile}** target allocation")
+    
+    # Create DataFrame for proper table display that will refresh
+    # Columns are pre-formatted as strings so the table renders without a Styler
+    target_series = pd.Series(target_allocations, dtype='float64').reindex(ASSET_CLASSES, fill_value=0.0)
+    variance = asset_class_allocations - target_series
+    allocation_comparison_data = {
+        'Asset Class': ASSET_CLASSES,
+        'Portfolio %': asset_class_allocations.map('{:.1f}%'.format).to_numpy(),
+        'Target %': target_series.map('{:.1f}%'.format).to_numpy(),
+        'Variance': np.where(variance > 0, '+', '') + variance.map('{:.1f}%'.format).to_numpy()
+    }
+    
+    # Display as a dataframe which will refresh properly
+    comparison_df = pd.DataFrame(allocation_comparison_data)
+    st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+    
+    # Summary metrics
+    st.markdown("---")
+    summary_cols = st.columns(3)
+    with summary_cols[0]:
+        st.metric("Total Allocated", f"{total_allocated:.1f}%")
+    with summary_cols[1]:
+        total_variance = variance.abs().sum()
+        st.metric("Total Absolute Variance", f"{total_variance:.1f}%")
+    with summary_cols[2]:
+        if total_allocated > 0:
+            tracking_error = (total_variance / len(ASSET_CLASSES))
+            st.metric("Average Tracking Error", f"{tracking_error:.1f}%")
+        else:
+            st.metric("Average Tracking Error", "N/A")
 
 # Check if portfolio is empty
 if not st.session_state.recommended_portfolio:
@@ -78,156 +487,80 @@ st.header("Portfolio Allocation")
 if portfolio_df is not None:
     st.write("Set the percentage allocation for each fund in your portfolio:")
     
-    # Create the allocation table
-    allocation_data = []
-    total_allocation = 0.0
+    # Initialize Morningstar category mapping if not present
+    if 'morningstar_asset_class_mapping' not in st.session_state:
+        st.session_state.morningstar_asset_class_mapping = dict(DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING)
     
-    for apir, fund in st.session_state.recommended_portfolio.items():
-        # Get current allocation or default to empty
-        current_allocation = st.session_state.portfolio_allocations.get(apir, "")
-        
-        allocation_data.append({
-            'Allocation %': current_allocation,
-            'Fund Name': fund['Name'],
-            'APIR Code': apir,
-            'Category': fund['Morningstar Category']
-        })
-        
-        # Calculate total if allocation is a valid number
-        try:
-            if current_allocation:
-                total_allocation += float(current_allocation)
-        except ValueError:
-            pass
+    # Create the allocation table column by column from the portfolio DataFrame
+    portfolio_apir_codes = portfolio_df['APIR Code']
     
-    # Create DataFrame for the allocation table
-    allocation_df = pd.DataFrame(allocation_data)
+    allocation_df = pd.DataFrame({
+        # Get current allocation or leave empty
+        'Allocation %': portfolio_apir_codes.map(get_allocation_series()),
+        'Fund Name': portfolio_df['Name'],
+        'APIR Code': portfolio_apir_codes,
+        'Category': portfolio_df['Morningstar Category'],
+        # Keep a chosen asset class, otherwise use the mapped one
+        'Asset Class': get_fund_asset_classes(
+            portfolio_df.set_index('APIR Code')['Morningstar Category'],
+            st.session_state.asset_class_mapping,
+            st.session_state.morningstar_asset_class_mapping
+        ).to_numpy(),
+        'Comments': portfolio_df['Comments']
+    })
     
-    # Display the allocation table using custom input fields for better navigation
+    # Display the allocation table as a single editable grid
     st.write("**Portfolio Allocation Table**")
-    st.write("💡 **Tip:** Use Tab key to move between allocation fields for quick data entry")
-    st.info("ℹ️ **Asset classes are automatically mapped** from Morningstar categories using the settings in the Assumptions page")
+    st.write("💡 **Tip:** Click an Allocation % or Asset Class cell to edit it, use the arrow keys to move between funds, then click **Update Allocations**")
+    st.info("ℹ️ **Asset classes are automatically mapped** from Morningstar categories using the settings in the Assumptions page, pick a different asset class in the table to override it")
+    
+    # Edits are applied together when the form is submitted, not on every cell change
+    with st.form("allocation_form"):
+        st.data_editor(
+            allocation_df,
+            column_config={
+                'Allocation %': st.column_config.NumberColumn(
+                    "Allocation %",
+                    min_value=0.0,
+                    max_value=100.0,
+                    step=0.1,
+                    format="%.1f"
+                ),
+                'Asset Class': st.column_config.SelectboxColumn(
+                    "Asset Class",
+                    help="Auto-mapped from the Morningstar category",
+                    options=ASSET_CLASSES,
+                    required=True,
+                    default=ASSET_CLASSES[0]
+                )
+            },
+            disabled=['Fund Name', 'APIR Code', 'Category', 'Comments'],
+            hide_index=True,
+            use_container_width=True,
+            key="allocation_editor"
+        )
+        
+        # Only the edited cells are saved, in the submit callback before the page is redrawn
+        st.form_submit_button("Update Allocations", use_container_width=True,
+                              on_click=save_allocation_edits, args=(allocation_df['APIR Code'].tolist(),))
     
-    # Create a table-like layout with individual input fields
-    # Header row
-    col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 2, 2, 1])
+    # Remove funds from the portfolio
+    col1, col2 = st.columns([3, 1])
     with col1:
-        st.write("**Allocation %**")
+        funds_to_remove = st.multiselect(
+            "Select funds to remove from the portfolio",
+            options=list(st.session_state.recommended_portfolio.keys()),
+            format_func=lambda apir: st.session_state.recommended_portfolio[apir]['Name'],
+            key="funds_to_remove"
+        )
     with col2:
-        st.write("**Fund Name**")
-    with col3:
-        st.write("**APIR Code**")
-    with col4:
-        st.write("**Category**")
-    with col5:
-        st.write("**Asset Class**")
-    with col6:
-        st.write("**Action**")
-    
-    # Data rows with individual input fields
-    # Asset class options
-    asset_classes = [
-        'Cash', 
-        'Australian Fixed Interest', 
-        'International Fixed Interest', 
-        'Australian Equities', 
-        'International Equities', 
-        'Property', 
-        'Alternatives'
-    ]
-    
-    for idx, (apir, fund) in enumerate(st.session_state.recommended_portfolio.items()):
-        col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 2, 2, 1])
-        
-        with col1:
-            # Get current allocation
-            current_allocation = st.session_state.portfolio_allocations.get(apir, "")
-            # Convert to float for number input, or use None if empty
-            allocation_value = float(current_allocation) if current_allocation and current_allocation != "" else None
-            
-            # Create number input with unique key
-            new_allocation = st.number_input(
-                label=f"Allocation for {fund['Name']}",
-                min_value=0.0,
-                max_value=100.0,
-                value=allocation_value,
-                step=0.1,
-                format="%.1f",
-                key=f"allocation_{apir}",
-                label_visibility="collapsed"
-            )
-            
-            # Update session state with new allocation
-            st.session_state.portfolio_allocations[apir] = new_allocation if new_allocation is not None else ""
-        
-        with col2:
-            st.write(fund['Name'])
-            # Show comments if available
-            if 'Comments' in fund and fund['Comments']:
-                st.caption(f"💬 {fund['Comments']}")
-        
-        with col3:
-            st.write(apir)
-        
-        with col4:
-            st.write(fund['Morningstar Category'])
-        
-        with col5:
-            # Get asset class from Morningstar category mapping
-            morningstar_category = fund.get('Morningstar Category', '')
-            
-            # Initialize Morningstar category mapping if not present
-            if 'morningstar_asset_class_mapping' not in st.session_state:
-                st.session_state.morningstar_asset_class_mapping = {
-                    'Alternative - Private Equity': 'Alternatives',
-                    'Alternative - Multistrategy': 'Alternatives',
-                    'Australia Equity Income': 'Australian Equities',
-                    'Australian Cash': 'Cash',
-                    'Bonds - Australia': 'Australian Fixed Interest',
-                    'Bonds - Global': 'International Fixed Interest',
-                    'Equity Australia Large Blend': 'Australian Equities',
-                    'Equity Australia Large Growth': 'Australian Equities',
-                    'Equity Australia Large Value': 'Australian Equities',
-                    'Equity Australia Mid/Small Growth': 'Australian Equities',
-                    'Equity Australia Real Estate': 'Property',
-                    'Equity Emerging Markets': 'International Equities',
-                    'Equity Global Real Estate': 'Property',
-                    'Equity Region Emerging Markets': 'International Equities',
-                    'Equity Sector Global - Real Estate': 'Property',
-                    'Equity World - Currency Hedged': 'International Equities',
-                    'Equity World Large Blend': 'International Equities',
-                    'Equity World Large Growth': 'International Equities',
-                    'Equity World Large Value': 'International Equities',
-                    'Equity World Mid/Small': 'International Equities',
-                    'Global Bond': 'International Fixed Interest'
-                }
-            
-            # Get mapped asset class
-            mapped_asset_class = st.session_state.morningstar_asset_class_mapping.get(
-                morningstar_category, 'Cash'  # Default to Cash if category not found
-            )
-            
-            # Display the mapped asset class (read-only)
-            st.write(f"**{mapped_asset_class}**")
-            st.caption("*Auto-mapped*")
-            
-            # Update the asset class mapping in session state for backward compatibility
-            st.session_state.asset_class_mapping[apir] = mapped_asset_class
-        
-        with col6:
-            # Add remove button for each fund
-            if st.button("Remove", key=f"remove_{apir}", use_container_width=True):
-                remove_from_portfolio(apir)
-    
-    # Calculate and display total allocation
-    total_allocation = 0.0
-    for apir in st.session_state.recommended_portfolio.keys():
-        try:
-            allocation = st.session_state.portfolio_allocations.get(apir, "")
-            if allocation and allocation != "":
-                total_allocation += float(allocation)
-        except (ValueError, TypeError):
-            pass
+        st.write("")
+        # Remove in the button callback so the page redraws without the funds in the same rerun
+        st.button("Remove Selected", use_container_width=True, disabled=not funds_to_remove,
+                  on_click=remove_from_portfolio, args=(funds_to_remove,))
+    
+    # Calculate and display total allocation, unset allocations are skipped
+    total_allocation = get_allocation_series().reindex(list(st.session_state.recommended_portfolio.keys())).sum()
     
     # Display allocation summary
     col1, col2, col3 = st.columns(3)
@@ -244,194 +577,32 @@ if portfolio_df is not None:
         else:
             st.info("📝 Allocation in progress")
     
+    # Get detailed fund data once and share it with the analysis, metrics and report sections below
+    portfolio_apirs = list(st.session_state.recommended_portfolio.keys())
+    detailed_portfolio = None
+    data_fingerprint = get_data_fingerprint('combined_data')
+    if data_fingerprint is not None:
+        # Reruns with the same data and funds reuse the cached slice without hashing the full dataset
+        detailed_portfolio = get_portfolio_slice(st.session_state.combined_data, data_fingerprint, tuple(portfolio_apirs))
+    
     # Portfolio Asset Class Allocation Analysis
     st.header("Portfolio Asset Class Allocation")
     
     if not st.session_state.recommended_portfolio:
         st.info("Add funds to your portfolio to see asset class allocation analysis")
     else:
-        # Get detailed fund data for asset class analysis
-        if st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
-            portfolio_apirs = list(st.session_state.recommended_portfolio.keys())
-            detailed_portfolio = st.session_state.combined_data[
-                st.session_state.combined_data['APIR Code'].isin(portfolio_apirs)
-            ]
-            
+        # Use the detailed fund data for asset class analysis
+        if detailed_portfolio is not None:
             if not detailed_portfolio.empty:
-                # Asset class options
-                asset_classes = [
-                    'Cash', 
-                    'Australian Fixed Interest', 
-                    'International Fixed Interest', 
-                    'Australian Equities', 
-                    'International Equities', 
-                    'Property', 
-                    'Alternatives'
-                ]
-                
-                # Calculate portfolio asset class allocations using Morningstar mapping
-                asset_class_allocations = {ac: 0.0 for ac in asset_classes}
-                total_allocated = 0.0
-                
-                for apir in portfolio_apirs:
-                    # Get allocation percentage
-                    allocation = st.session_state.portfolio_allocations.get(apir, "")
-                    allocation_pct = 0.0
-                    if allocation and allocation != "":
-                        try:
-                            allocation_pct = float(allocation)
-                            total_allocated += allocation_pct
-                        except (ValueError, TypeError):
-                            allocation_pct = 0.0
-                    
-                    # Get fund details to find Morningstar category
-                    fund_info = detailed_portfolio[detailed_portfolio['APIR Code'] == apir]
-                    if not fund_info.empty:
-                        morningstar_category = fund_info.iloc[0].get('Morningstar Category', '')
-                        
-                        # Get asset class from Morningstar mapping
-                        if 'morningstar_asset_class_mapping' in st.session_state:
-                            selected_asset_class = st.session_state.morningstar_asset_class_mapping.get(
-                                morningstar_category, 'Cash'  # Default to Cash if not found
-                            )
-                        else:
-                            # Fallback to manual mapping if Morningstar mapping not available
-                            selected_asset_class = st.session_state.asset_class_mapping.get(apir, asset_classes[0])
-                        
-                        # Add to asset class total
-                        if selected_asset_class in asset_class_allocations:
-                            asset_class_allocations[selected_asset_class] += allocation_pct
-                
-                # Portfolio vs Target Allocation Analysis
-                st.subheader("Portfolio vs Target Allocation")
-                
-                # Get target allocation from assumptions page (use Balanced as default)
-                target_profile = st.selectbox(
-                    "Select target risk profile for comparison:",
-                    ['Defensive (100/0)', 'Conservative (80/20)', 'Moderate (60/40)', 'Balanced (40/60)', 'Growth (20/80)', 'High Growth (0/100)'],
-                    index=3,  # Default to Balanced
-                    key="target_profile_select",
-                    help="Select a risk profile to compare your portfolio allocation against the strategic target allocation"
+                # Calculate portfolio asset class allocations, same as the Excel report
+                total_allocated = get_allocation_series().reindex(portfolio_apirs).fillna(0.0).sum()
+                asset_class_allocations = calculate_asset_class_allocations(
+                    detailed_portfolio, get_allocation_series(), portfolio_apirs,
+                    st.session_state.asset_class_mapping, st.session_state.morningstar_asset_class_mapping
                 )
                 
-                # Force rerun when profile changes
-                if 'previous_target_profile' not in st.session_state:
-                    st.session_state.previous_target_profile = target_profile
-                elif st.session_state.previous_target_profile != target_profile:
-                    st.session_state.previous_target_profile = target_profile
-                    st.rerun()
-                
-                # Initialize session state for strategic asset allocation if not present
-                if 'strategic_asset_allocation' not in st.session_state:
-                    st.session_state.strategic_asset_allocation = {
-                        'Asset Class': ['Cash', 'Fixed Interest', 'International Fixed Interest', 'Australian Shares', 'International Shares', 'Property', 'Alternatives'],
-                        'Type': ['Income', 'Income', 'Income', 'Growth', 'Growth', 'Income and Growth', 'Income and Growth'],
-                        'Defensive (100/0)': [70, 30, 0, 0, 0, 0, 0],
-                        'Conservative (80/20)': [20, 40, 20, 8, 6, 3, 3],
-                        'Moderate (60/40)': [15, 30, 15, 18, 12, 5, 5],
-                        'Balanced (40/60)': [5, 25, 10, 28, 20, 6, 6],
-                        'Growth (20/80)': [2, 12, 6, 38, 26, 8, 8],
-                        'High Growth (0/100)': [2, 0, 0, 48, 34, 8, 8]
-                    }
-                
-                # Initialize Morningstar category mapping if not present
-                if 'morningstar_asset_class_mapping' not in st.session_state:
-                    st.session_state.morningstar_asset_class_mapping = {
-                        'Alternative - Private Equity': 'Alternatives',
-                        'Australia Equity Income': 'Australian Equities',
-                        'Australian Cash': 'Cash',
-                        'Bonds - Australia': 'Australian Fixed Interest',
-                        'Equity Australia Large Blend': 'Australian Equities',
-                        'Equity Australia Large Growth': 'Australian Equities',
-                        'Equity Australia Large Value': 'Australian Equities',
-                        'Equity Australia Mid/Small Growth': 'Australian Equities',
-                        'Equity Australia Real Estate': 'Property',
-                        'Equity Emerging Markets': 'International Equities',
-                        'Equity Region Emerging Markets': 'International Equities',
-                        'Equity Sector Global - Real Estate': 'Property',
-                        'Equity World - Currency Hedged': 'International Equities',
-                        'Equity World Large Blend': 'International Equities',
-                        'Equity World Large Growth': 'International Equities',
-                        'Equity World Large Value': 'International Equities',
-                        'Equity World Mid/Small': 'International Equities',
-                        'Global Bond': 'International Fixed Interest'
-                    }
-                
-                # Get target allocations from assumptions page
-                target_allocations = {}
-                asset_class_names = st.session_state.strategic_asset_allocation['Asset Class']
-                
-                # Get target values for the selected profile
-                if target_profile in st.session_state.strategic_asset_allocation:
-                    target_values = st.session_state.strategic_asset_allocation[target_profile]
-                    
-                    # Map assumption page asset classes to our asset classes
-                    asset_class_mapping = {
-                        'Cash': 'Cash',
-                        'Fixed Interest': 'Australian Fixed Interest',
-                        'International Fixed Interest': 'International Fixed Interest',
-                        'Australian Shares': 'Australian Equities',
-                        'International Shares': 'International Equities',
-                        'Property': 'Property',
-                        'Alternatives': 'Alternatives'
-                    }
-                    
-                    # Build target allocations dictionary
-                    for i, assumption_asset_class in enumerate(asset_class_names):
-                        mapped_class = asset_class_mapping.get(assumption_asset_class, assumption_asset_class)
-                        if mapped_class in target_allocations:
-                            target_allocations[mapped_class] += target_values[i]
-                        else:
-                            target_allocations[mapped_class] = target_values[i]
-                else:
-                    # Fallback if profile not found
-                    target_allocations = {
-                        'Cash': 5,
-                        'Australian Fixed Interest': 25,
-                        'International Fixed Interest': 10,
-                        'Australian Equities': 28,
-                        'International Equities': 20,
-                        'Property': 6,
-                        'Alternatives': 6
-                    }
-                
-                # Display current profile being compared
-                st.info(f"Comparing against **{target_profile}** target allocation")
-                
-                # Create DataFrame for proper table display that will refresh
-                allocation_comparison_data = []
-                for asset_class in asset_classes:
-                    portfolio_pct = asset_class_allocations.get(asset_class, 0.0)
-                    target_pct = target_allocations.get(asset_class, 0.0)
-                    variance = portfolio_pct - target_pct
-                    
-                    variance_str = f"+{variance:.1f}%" if variance > 0 else f"{variance:.1f}%" if variance < 0 else "0.0%"
-                    
-                    allocation_comparison_data.append({
-                        'Asset Class': asset_class,
-                        'Portfolio %': f"{portfolio_pct:.1f}%",
-                        'Target %': f"{target_pct:.1f}%",
-                        'Variance': variance_str
-                    })
-                
-                # Display as a dataframe which will refresh properly
-                comparison_df = pd.DataFrame(allocation_comparison_data)
-                st.dataframe(comparison_df, use_container_width=True, hide_index=True)
-                
-                # Summary metrics
-                st.markdown("---")
-                summary_cols = st.columns(3)
-                with summary_cols[0]:
-                    st.metric("Total Allocated", f"{total_allocated:.1f}%")
-                with summary_cols[1]:
-                    total_variance = sum(abs(asset_class_allocations[ac] - target_allocations.get(ac, 0)) for ac in asset_classes)
-                    st.metric("Total Absolute Variance", f"{total_variance:.1f}%")
-                with summary_cols[2]:
-                    if total_allocated > 0:
-                        tracking_error = (total_variance / len(asset_classes))
-                        st.metric("Average Tracking Error", f"{tracking_error:.1f}%")
-                    else:
-                        st.metric("Average Tracking Error", "N/A")
+                # Portfolio vs Target Allocation Analysis, changing the profile reruns only this fragment
+                target_comparison(asset_class_allocations, total_allocated)
             else:
                 st.warning("Unable to retrieve detailed fund data for asset class analysis")
         else:
@@ -440,55 +611,22 @@ if portfolio_df is not None:
     # Calculate portfolio-level metrics
     st.header("Portfolio Metrics")
     
-    # Get detailed fund data for metric calculations
+    # Use the detailed fund data for metric calculations
     portfolio_metrics = None
-    if st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
-        portfolio_apirs = list(st.session_state.recommended_portfolio.keys())
-        detailed_portfolio = st.session_state.combined_data[
-            st.session_state.combined_data['APIR Code'].isin(portfolio_apirs)
-        ]
-        
-        if not detailed_portfolio.empty:
+    if detailed_portfolio is not None:
+        if detailed_portfolio.empty:
+            st.warning("Unable to retrieve detailed fund data for portfolio metrics")
+        elif total_allocation <= 0:
+            # Nothing is allocated yet, so skip the weighted calculations entirely
+            st.info("Portfolio metrics will be calculated when allocations are set")
+        else:
             # Calculate weighted portfolio metrics
-            weighted_stddev = 0.0
-            weighted_beta = 0.0
-            weighted_sharpe = 0.0
-            weighted_mer = 0.0
-            weighted_return = 0.0
-            total_weight = 0.0
-            
-            for apir in portfolio_apirs:
-                allocation = st.session_state.portfolio_allocations.get(apir, "")
-                if allocation and allocation != "":
-                    try:
-                        weight = float(allocation) / 100.0  # Convert percentage to decimal
-                        fund_data = detailed_portfolio[detailed_portfolio['APIR Code'] == apir]
-                        
-                        if not fund_data.empty:
-                            fund_row = fund_data.iloc[0]
-                            
-                            # Get metrics, handle NaN values
-                            stddev = fund_row.get('3 Year Standard Deviation', 0)
-                            beta = fund_row.get('3 Year Beta', 0)
-                            sharpe = fund_row.get('3 Year Sharpe Ratio', 0)
-                            mer = fund_row.get('Investment Management Fee(%)', 0)
-                            return_3yr = fund_row.get('3 Years Annualised (%)', 0)
-                            
-                            # Only include in calculation if values are not NaN
-                            if pd.notna(stddev):
-                                weighted_stddev += weight * float(stddev)
-                            if pd.notna(beta):
-                                weighted_beta += weight * float(beta)
-                            if pd.notna(sharpe):
-                                weighted_sharpe += weight * float(sharpe)
-                            if pd.notna(mer):
-                                weighted_mer += weight * float(mer)
-                            if pd.notna(return_3yr):
-                                weighted_return += weight * float(return_3yr)
-                            
-                            total_weight += weight
-                    except (ValueError, TypeError):
-                        continue
+            weighted_metrics, total_weight = calculate_weighted_metrics(detailed_portfolio, get_allocation_series(), portfolio_apirs)
+            weighted_return = weighted_metrics['3 Years Annualised (%)']
+            weighted_stddev = weighted_metrics['3 Year Standard Deviation']
+            weighted_beta = weighted_metrics['3 Year Beta']
+            weighted_sharpe = weighted_metrics['3 Year Sharpe Ratio']
+            weighted_mer = weighted_metrics['Investment Management Fee(%)']
             
             # Display portfolio metrics
             if total_weight > 0:
@@ -515,234 +653,16 @@ if portfolio_df is not None:
                     st.info(f"Portfolio metrics calculated based on {coverage_pct:.1f}% of allocated funds")
             else:
                 st.info("Portfolio metrics will be calculated when allocations are set")
-        else:
-            st.warning("Unable to retrieve detailed fund data for portfolio metrics")
     else:
         st.info("No data available for portfolio metric calculations")
     
     # Download portfolio with allocations and comprehensive data
-    st.subheader("Download Portfolio Report")
-    
-    # Initialize session state for excel data
-    if 'excel_data' not in st.session_state:
-        st.session_state.excel_data = None
-    
-    # Create comprehensive Excel file with multiple sheets
-    if st.button("Download Portfolio Report"):
-        with st.spinner("Generating portfolio report..."):
-            # Create an Excel file with multiple sheets
-            output = io.BytesIO()
-            
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                # Sheet 1: All Formula Filtered Data
-                if st.session_state.filtered_selection is not None and not st.session_state.filtered_selection.empty:
-                    st.session_state.filtered_selection.to_excel(writer, sheet_name='All Formula Filtered Data', index=False)
-                elif st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
-                    st.session_state.combined_data.to_excel(writer, sheet_name='All Combined Data', index=False)
-                
-                # Sheet 2: Portfolio Analysis
-                portfolio_sheet_data = []
-                
-                # Add portfolio funds with allocations
-                portfolio_with_allocations = portfolio_df.copy()
-                portfolio_with_allocations['Allocation %'] = portfolio_with_allocations['APIR Code'].map(
-                    lambda x: st.session_state.portfolio_allocations.get(x, "")
-                )
-                
-                # Get detailed fund information for portfolio
-                if st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
-                    portfolio_apirs = list(st.session_state.recommended_portfolio.keys())
-                    detailed_portfolio = st.session_state.combined_data[
-                        st.session_state.combined_data['APIR Code'].isin(portfolio_apirs)
-                    ]
-                
-                    if not detailed_portfolio.empty:
-                        # Merge portfolio allocations with detailed data
-                        detailed_with_allocations = detailed_portfolio.copy()
-                        detailed_with_allocations['Allocation %'] = detailed_with_allocations['APIR Code'].map(
-                            lambda x: st.session_state.portfolio_allocations.get(x, "")
-                        )
-                        detailed_with_allocations['Asset Class'] = detailed_with_allocations['APIR Code'].map(
-                            lambda x: st.session_state.asset_class_mapping.get(x, "")
-                        )
-                        
-                        # Reorder columns to have Allocation % as second column and APIR Code as third
-                        columns = detailed_with_allocations.columns.tolist()
-                        
-                        # Remove the columns we want to reorder
-                        if 'Allocation %' in columns:
-                            columns.remove('Allocation %')
-                        if 'APIR Code' in columns:
-                            columns.remove('APIR Code')
-                        
-                        # Create new column order: Name, Allocation %, APIR Code, then rest
-                        new_columns = []
-                        if 'Name' in columns:
-                            new_columns.append('Name')
-                            columns.remove('Name')
-                        
-                        new_columns.extend(['Allocation %', 'APIR Code'])
-                        new_columns.extend(columns)
-                        
-                        # Reorder the dataframe
-                        detailed_with_allocations = detailed_with_allocations[new_columns]
-                        
-                        # Create a clean portfolio analysis sheet with separate sections
-                        
-                        # Section 1: Portfolio Funds with Allocations
-                        portfolio_funds_section = detailed_with_allocations.copy()
-                        portfolio_funds_section.to_excel(writer, sheet_name='Portfolio Analysis', index=False, startrow=0)
-                        
-                        # Get the starting row for the next section
-                        current_row = len(portfolio_funds_section) + 3
-                        
-                        # Section 2: Portfolio Metrics
-                        total_weight = 0.0
-                        weighted_return = 0.0
-                        weighted_stddev = 0.0
-                        weighted_beta = 0.0
-                        weighted_sharpe = 0.0
-                        weighted_mer = 0.0
-                        
-                        for apir in portfolio_apirs:
-                            allocation = st.session_state.portfolio_allocations.get(apir, "")
-                            if allocation and allocation != "":
-                                try:
-                                    weight = float(allocation) / 100.0
-                                    fund_data = detailed_portfolio[detailed_portfolio['APIR Code'] == apir]
-                                    
-                                    if not fund_data.empty:
-                                        fund_row = fund_data.iloc[0]
-                                        
-                                        return_3yr = fund_row.get('3 Years Annualised (%)', 0)
-                                        stddev = fund_row.get('3 Year Standard Deviation', 0)
-                                        beta = fund_row.get('3 Year Beta', 0)
-                                        sharpe = fund_row.get('3 Year Sharpe Ratio', 0)
-                                        mer = fund_row.get('Investment Management Fee(%)', 0)
-                                        
-                                        if pd.notna(return_3yr):
-                                            weighted_return += weight * float(return_3yr)
-                                        if pd.notna(stddev):
-                                            weighted_stddev += weight * float(stddev)
-                                        if pd.notna(beta):
-                                            weighted_beta += weight * float(beta)
-                                        if pd.notna(sharpe):
-                                            weighted_sharpe += weight * float(sharpe)
-                                        if pd.notna(mer):
-                                            weighted_mer += weight * float(mer)
-                                        
-                                        total_weight += weight
-                                except (ValueError, TypeError):
-                                    continue
-                        
-                        # Create metrics dataframe with clean structure
-                        metrics_data = pd.DataFrame([
-                            ['Portfolio 3Yr Return (%)', f"{weighted_return:.2f}"],
-                            ['Portfolio Standard Deviation', f"{weighted_stddev:.2f}"],
-                            ['Portfolio Beta', f"{weighted_beta:.2f}"],
-                            ['Portfolio Sharpe Ratio', f"{weighted_sharpe:.2f}"],
-                            ['Portfolio MER (%)', f"{weighted_mer:.2f}"],
-                            ['Total Portfolio Weight (%)', f"{total_weight * 100:.1f}"]
-                        ], columns=['Metric', 'Value'])
-                        
-                        metrics_data.to_excel(writer, sheet_name='Portfolio Analysis', index=False, startrow=current_row)
-                        current_row += len(metrics_data) + 3
-                        
-                        # Section 3: Asset Class Allocation Analysis
-                        asset_classes = ['Cash', 'Australian Fixed Interest', 'International Fixed Interest', 
-                                       'Australian Equities', 'International Equities', 'Property', 'Alternatives']
-                        asset_class_allocations = {ac: 0.0 for ac in asset_classes}
-                        
-                        for apir in portfolio_apirs:
-                            allocation = st.session_state.portfolio_allocations.get(apir, "")
-                            if allocation and allocation != "":
-                                try:
-                                    allocation_pct = float(allocation)
-                                    selected_asset_class = st.session_state.asset_class_mapping.get(apir, asset_classes[0])
-                                    if selected_asset_class in asset_class_allocations:
-                                        asset_class_allocations[selected_asset_class] += allocation_pct
-                                except (ValueError, TypeError):
-                                    continue
-                        
-                        # Get target allocations
-                        target_profile = "Balanced (40/60)"  # Default
-                        target_allocations = {}
-                        
-                        if 'strategic_asset_allocation' in st.session_state:
-                            asset_class_names = st.session_state.strategic_asset_allocation['Asset Class']
-                            target_values = st.session_state.strategic_asset_allocation[target_profile]
-                            
-                            asset_class_mapping = {
-                                'Cash': 'Cash',
-                                'Fixed Interest': 'Australian Fixed Interest',
-                                'International Fixed Interest': 'International Fixed Interest',
-                                'Australian Shares': 'Australian Equities',
-                                'International Shares': 'International Equities',
-                                'Property': 'Property',
-                                'Alternatives': 'Alternatives'
-                            }
-                            
-                            for i, assumption_asset_class in enumerate(asset_class_names):
-                                mapped_class = asset_class_mapping.get(assumption_asset_class, assumption_asset_class)
-                                if mapped_class in target_allocations:
-                                    target_allocations[mapped_class] += target_values[i]
-                                else:
-                                    target_allocations[mapped_class] = target_values[i]
-                        else:
-                            # Default target allocations
-                            target_allocations = {
-                                'Cash': 5, 'Australian Fixed Interest': 25, 'International Fixed Interest': 10,
-                                'Australian Equities': 28, 'International Equities': 20, 'Property': 6, 'Alternatives': 6
-                            }
-                        
-                        # Create allocation comparison data
-                        allocation_comparison = []
-                        for asset_class in asset_classes:
-                            portfolio_pct = asset_class_allocations.get(asset_class, 0.0)
-                            target_pct = target_allocations.get(asset_class, 0.0)
-                            variance = portfolio_pct - target_pct
-                            allocation_comparison.append([asset_class, portfolio_pct, target_pct, variance])
-                        
-                        allocation_df = pd.DataFrame(allocation_comparison, 
-                                                   columns=['Asset Class', 'Portfolio %', 'Target %', 'Variance'])
-                        
-                        allocation_df.to_excel(writer, sheet_name='Portfolio Analysis', index=False, startrow=current_row)
-                    else:
-                        # Fallback if no detailed data available
-                        portfolio_with_allocations.to_excel(writer, sheet_name='Portfolio Analysis', index=False)
-                else:
-                    # Fallback if no main data available
-                    portfolio_with_allocations.to_excel(writer, sheet_name='Portfolio Analysis', index=False)
-        
-            # Prepare the file for download
-            output.seek(0)
-            st.session_state.excel_data = output.read()
-            
-            st.success("Portfolio report generated successfully! The Excel file contains two sheets: 'All Formula Filtered Data' and 'Portfolio Analysis'.")
-            st.rerun()  # Refresh to show the download button
-    
-    # Show download button if excel data is available
-    if st.session_state.excel_data is not None:
-        st.download_button(
-            label="📥 Download Portfolio Report (Excel)",
-            data=st.session_state.excel_data,
-            file_name="recommended_portfolio_report.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        
-        # Clear the excel data after download button is shown
-        if st.button("Generate New Report"):
-            st.session_state.excel_data = None
-            st.rerun()
+    portfolio_report(portfolio_df, detailed_portfolio, portfolio_apirs)
     
     # Optional: Also provide CSV download
     st.subheader("Alternative Download Options")
-    portfolio_with_allocations = portfolio_df.copy()
-    portfolio_with_allocations['Allocation %'] = portfolio_with_allocations['APIR Code'].map(
-        lambda x: st.session_state.portfolio_allocations.get(x, "")
-    )
-    
-    csv_portfolio = portfolio_with_allocations.to_csv(index=False)
+    # Add allocations without an explicit copy, the CSV bytes are cached until the data changes
+    csv_portfolio = dataframe_to_csv_bytes(portfolio_df.assign(**{'Allocation %': portfolio_df['APIR Code'].map(get_allocation_series())}))
     st.download_button(
         label="Download Portfolio with Allocations (CSV)",
         data=csv_portfolio,
@@ -751,31 +671,4 @@ if portfolio_df is not None:
     )
     
     # Get detailed fund information
-    if st.button("Generate Detailed Portfolio Report"):
-        st.subheader("Detailed Portfolio Report")
-        
-        # Attempt to get full details for each fund from the main data
-        if st.session_state.combined_data is not None and not st.session_state.combined_data.empty:
-            # Get list of APIR codes in the portfolio
-            portfolio_apirs = list(st.session_state.recommended_portfolio.keys())
-            
-            # Filter the main data to get only the selected funds
-            if 'APIR Code' in st.session_state.combined_data.columns:
-                detailed_portfolio = st.session_state.combined_data[
-                    st.session_state.combined_data['APIR Code'].isin(portfolio_apirs)
-                ]
-                
-                if not detailed_portfolio.empty:
-                    # Display the detailed portfolio data
-                    st.dataframe(detailed_portfolio, use_container_width=True)
-                    
-                    # Export detailed portfolio
-                    csv_detailed = detailed_portfolio.to_csv(index=False)
-                    st.download_button(
-                        label="Download Detailed Portfolio Report",
-                        data=csv_detailed,
-                        file_name="recommended_portfolio_detailed.csv",
-                        mime="text/csv",
-                    )
-                else:
-                    st.warning("Could not retrieve detailed information for the selected funds.")
\ No newline at end of file
+    detailed_report(detailed_portfolio)
\ No newline at end of file
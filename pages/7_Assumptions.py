@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from utils.data_processor import DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING
 
 # Set page config
 st.set_page_config(
@@ -23,29 +24,7 @@ if 'strategic_asset_allocation' not in st.session_state:
 
 # Initialize Morningstar category mapping in session state
 if 'morningstar_asset_class_mapping' not in st.session_state:
-    st.session_state.morningstar_asset_class_mapping = {
-        'Alternative - Private Equity': 'Alternatives',
-        'Alternative - Multistrategy': 'Alternatives',
-        'Australia Equity Income': 'Australian Equities',
-        'Australian Cash': 'Cash',
-        'Bonds - Australia': 'Australian Fixed Interest',
-        'Bonds - Global': 'International Fixed Interest',
-        'Equity Australia Large Blend': 'Australian Equities',
-        'Equity Australia Large Growth': 'Australian Equities',
-        'Equity Australia Large Value': 'Australian Equities',
-        'Equity Australia Mid/Small Growth': 'Australian Equities',
-        'Equity Australia Real Estate': 'Property',
-        'Equity Emerging Markets': 'International Equities',
-        'Equity Global Real Estate': 'Property',
-        'Equity Region Emerging Markets': 'International Equities',
-        'Equity Sector Global - Real Estate': 'Property',
-        'Equity World - Currency Hedged': 'International Equities',
-        'Equity World Large Blend': 'International Equities',
-        'Equity World Large Growth': 'International Equities',
-        'Equity World Large Value': 'International Equities',
-        'Equity World Mid/Small': 'International Equities',
-        'Global Bond': 'International Fixed Interest'
-    }
+    st.session_state.morningstar_asset_class_mapping = dict(DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING)
 
 st.title("📋 Assumptions")
 
@@ -292,58 +271,13 @@ with st.expander("Morningstar Category to Asset Class Mapping", expanded=True):
         with cols[2]:
             if st.button("Reset", key=f"reset_mapping_{category}"):
                 # Reset to default mapping
-                default_mappings = {
-                    'Alternative - Private Equity': 'Alternatives',
-                    'Alternative - Multistrategy': 'Alternatives',
-                    'Australia Equity Income': 'Australian Equities',
-                    'Australian Cash': 'Cash',
-                    'Bonds - Australia': 'Australian Fixed Interest',
-                    'Bonds - Global': 'International Fixed Interest',
-                    'Equity Australia Large Blend': 'Australian Equities',
-                    'Equity Australia Large Growth': 'Australian Equities',
-                    'Equity Australia Large Value': 'Australian Equities',
-                    'Equity Australia Mid/Small Growth': 'Australian Equities',
-                    'Equity Australia Real Estate': 'Property',
-                    'Equity Emerging Markets': 'International Equities',
-                    'Equity Global Real Estate': 'Property',
-                    'Equity Region Emerging Markets': 'International Equities',
-                    'Equity Sector Global - Real Estate': 'Property',
-                    'Equity World - Currency Hedged': 'International Equities',
-                    'Equity World Large Blend': 'International Equities',
-                    'Equity World Large Growth': 'International Equities',
-                    'Equity World Large Value': 'International Equities',
-                    'Equity World Mid/Small': 'International Equities',
-                    'Global Bond': 'International Fixed Interest'
-                }
-                if category in default_mappings:
-                    st.session_state.morningstar_asset_class_mapping[category] = default_mappings[category]
+                if category in DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING:
+                    st.session_state.morningstar_asset_class_mapping[category] = DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING[category]
                 st.rerun()
     
     # Reset all mappings button
     if st.button("Reset All Category Mappings to Defaults"):
-        st.session_state.morningstar_asset_class_mapping = {
-            'Alternative - Private Equity': 'Alternatives',
-            'Alternative - Multistrategy': 'Alternatives',
-            'Australia Equity Income': 'Australian Equities',
-            'Australian Cash': 'Cash',
-            'Bonds - Australia': 'Australian Fixed Interest',
-            'Bonds - Global': 'International Fixed Interest',
-            'Equity Australia Large Blend': 'Australian Equities',
-            'Equity Australia Large Growth': 'Australian Equities',
-            'Equity Australia Large Value': 'Australian Equities',
-            'Equity Australia Mid/Small Growth': 'Australian Equities',
-            'Equity Australia Real Estate': 'Property',
-            'Equity Emerging Markets': 'International Equities',
-            'Equity Global Real Estate': 'Property',
-            'Equity Region Emerging Markets': 'International Equities',
-            'Equity Sector Global - Real Estate': 'Property',
-            'Equity World - Currency Hedged': 'International Equities',
-            'Equity World Large Blend': 'International Equities',
-            'Equity World Large Growth': 'International Equities',
-            'Equity World Large Value': 'International Equities',
-            'Equity World Mid/Small': 'International Equities',
-            'Global Bond': 'International Fixed Interest'
-        }
+        st.session_state.morningstar_asset_class_mapping = dict(DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING)
         st.rerun()
 
 # Investment Analysis Assumptions
@@ -0,0 +1,36 @@
+import pandas as pd
+from utils.data_processor import convert_categorical_columns, count_by_category
+from utils.visualization import create_selection_summary_chart
+
+
+def make_filtered_selection():
+    combined_data = convert_categorical_columns(pd.DataFrame({
+        'Name': ['Fund A', 'Fund B', 'Fund C', 'Fund D'],
+        'APIR Code': ['AAA0001AU', 'BBB0002AU', 'CCC0003AU', 'DDD0004AU'],
+        'Morningstar Category': ['Equity Australia Large Blend', 'Equity Australia Large Blend',
+                                 'Bonds - Australia', 'Multisector Growth'],
+    }))
+    # Filtering keeps every category in the dtype, even those with no rows left
+    return combined_data[combined_data['Name'] != 'Fund D']
+
+
+def test_count_by_category_skips_unused_categories():
+    filtered_selection = make_filtered_selection()
+    assert isinstance(filtered_selection['Morningstar Category'].dtype, pd.CategoricalDtype)
+
+    category_counts = count_by_category(filtered_selection)
+
+    assert category_counts.to_dict() == {'Equity Australia Large Blend': 2, 'Bonds - Australia': 1}
+
+
+def test_count_by_category_on_text_column():
+    filtered_selection = make_filtered_selection().astype({'Morningstar Category': object})
+
+    assert count_by_category(filtered_selection).to_dict() == {'Equity Australia Large Blend': 2, 'Bonds - Australia': 1}
+
+
+def test_selection_summary_chart_has_no_empty_slices():
+    fig = create_selection_summary_chart(make_filtered_selection())
+
+    assert sorted(fig.data[0].labels) == ['Bonds - Australia', 'Equity Australia Large Blend']
+    assert list(fig.data[0].values) == [2, 1]
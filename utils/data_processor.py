@@ -11,6 +11,34 @@ REQUIRED_COLUMNS = ['Name', 'APIR Code', 'Morningstar Category', '3 Years Annual
 NUMERIC_COLUMNS = ['3 Years Annualised (%)', 'Investment Management Fee(%)', 
                    '3 Year Beta', '3 Year Standard Deviation', '3 Year Sharpe Ratio']
 
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['Morningstar Category', 'Equity StyleBox™']
+
+# Default Morningstar category to asset class mapping, editable on the Assumptions page
+DEFAULT_MORNINGSTAR_ASSET_CLASS_MAPPING = {
+    'Alternative - Private Equity': 'Alternatives',
+    'Alternative - Multistrategy': 'Alternatives',
+    'Australia Equity Income': 'Australian Equities',
+    'Australian Cash': 'Cash',
+    'Bonds - Australia': 'Australian Fixed Interest',
+    'Bonds - Global': 'International Fixed Interest',
+    'Equity Australia Large Blend': 'Australian Equities',
+    'Equity Australia Large Growth': 'Australian Equities',
+    'Equity Australia Large Value': 'Australian Equities',
+    'Equity Australia Mid/Small Growth': 'Australian Equities',
+    'Equity Australia Real Estate': 'Property',
+    'Equity Emerging Markets': 'International Equities',
+    'Equity Global Real Estate': 'Property',
+    'Equity Region Emerging Markets': 'International Equities',
+    'Equity Sector Global - Real Estate': 'Property',
+    'Equity World - Currency Hedged': 'International Equities',
+    'Equity World Large Blend': 'International Equities',
+    'Equity World Large Growth': 'International Equities',
+    'Equity World Large Value': 'International Equities',
+    'Equity World Mid/Small': 'International Equities',
+    'Global Bond': 'International Fixed Interest'
+}
+
 def validate_csv(file):
     """
     Validate if the CSV file has the required columns and format.
@@ -235,6 +263,75 @@ def combine_dataframes(dataframes):
         print(f"Error combining dataframes: {str(e)}")
         return None
 
+def convert_categorical_columns(df):
+    """
+    Convert low-cardinality text columns to the pandas category dtype.
+    
+    Parameters:
+    df (DataFrame): DataFrame containing investment data
+    
+    Returns:
+    DataFrame: DataFrame with categorical text columns
+    """
+    if df is None or df.empty:
+        return df
+    
+    # Cast the combined data once so later groupbys and filters work on integer codes
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    
+    return df
+
+def count_by_category(df):
+    """
+    Count the funds in each Morningstar Category present in the data.
+    
+    Parameters:
+    df (DataFrame): DataFrame containing investment data
+    
+    Returns:
+    Series: Fund counts by category, largest first
+    """
+    # A categorical column counts every category, so drop the ones with no rows in this selection
+    return df['Morningstar Category'].value_counts()[lambda counts: counts > 0]
+
+def downcast_numeric_columns(df):
+    """
+    Downcast numeric columns to 32-bit floats and the smallest fitting integers for display.
+    
+    Parameters:
+    df (DataFrame): DataFrame containing investment data
+    
+    Returns:
+    DataFrame: Copy of the DataFrame with downcast numeric columns
+    """
+    if df is None or df.empty:
+        return df
+    
+    # Only shrink what is sent to the browser; filters and averages keep full precision
+    downcast = {col: 'float32' for col in df.select_dtypes(include=['float64']).columns}
+    for col in df.select_dtypes(include=['int64']).columns:
+        downcast[col] = pd.to_numeric(df[col], downcast='integer').dtype
+    
+    return df.astype(downcast)
+
+def get_column_order(columns, preferred_order=REQUIRED_COLUMNS):
+    """
+    Order columns with the preferred columns first, followed by any others.
+
+    Parameters:
+    columns (iterable): Column names present in the dataframe
+    preferred_order (list): Column names to place first, in order
+
+    Returns:
+    list: Column names in display order
+    """
+    existing = dict.fromkeys(columns)
+    ordered = [col for col in preferred_order if col in existing]
+    preferred = set(ordered)
+    return ordered + [col for col in existing if col not in preferred]
+
 def calculate_asset_class_averages(df):
     """
     Calculate average metrics for each asset class (Morningstar Category).
@@ -251,7 +348,7 @@ def calculate_asset_class_averages(df):
     try:
         # Group by Morningstar Category (asset class) and calculate mean values
         # This will automatically exclude NaN values from the calculation
-        asset_class_averages = df.groupby('Morningstar Category').mean(numeric_only=True)
+        asset_class_averages = df.groupby('Morningstar Category', observed=True).mean(numeric_only=True)
         
 
         
@@ -19,6 +19,20 @@ def bytes_to_dataframe(bytes_data):
         return None
     return pickle.loads(bytes_data)
 
+# Function to serialize a dataframe to CSV bytes for download buttons
+@st.cache_data
+def dataframe_to_csv_bytes(df, index=False):
+    """Convert dataframe to UTF-8 CSV bytes, cached until the dataframe changes"""
+    return df.to_csv(index=index).encode('utf-8')
+
+# Function to serialize a dataframe to Parquet bytes for download buttons
+@st.cache_data
+def dataframe_to_parquet_bytes(df, index=False):
+    """Convert dataframe to Parquet bytes, cached until the dataframe changes"""
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=index)
+    return buffer.getvalue()
+
 # Function to initialize or retrieve data from session state
 def get_data(key, default=None):
     """Get data from session state with dictionary access for better persistence"""
@@ -210,11 +210,11 @@ def calculate_performance_metrics(df):
                 if metric in result.columns:
                     # For expenses, lower is better, so invert the percentile
                     if metric == 'Investment Management Fee(%)' or metric == '3 Year Standard Deviation':
-                        result[f'{metric} Category Percentile'] = result.groupby('Morningstar Category')[metric].transform(
+                        result[f'{metric} Category Percentile'] = result.groupby('Morningstar Category', observed=True)[metric].transform(
                             lambda x: (1 - (x.rank(pct=True))) * 100
                         )
                     else:
-                        result[f'{metric} Category Percentile'] = result.groupby('Morningstar Category')[metric].transform(
+                        result[f'{metric} Category Percentile'] = result.groupby('Morningstar Category', observed=True)[metric].transform(
                             lambda x: x.rank(pct=True) * 100
                         )
         
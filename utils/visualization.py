@@ -3,6 +3,7 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from utils.data_processor import count_by_category
 
 def create_asset_class_chart(asset_class_df):
     """
@@ -110,7 +111,7 @@ def create_selection_comparison_chart(asset_class_averages, filtered_selection):
     
     try:
         # Calculate averages for the filtered selection by Morningstar Category
-        selection_averages = filtered_selection.groupby('Morningstar Category').mean()
+        selection_averages = filtered_selection.groupby('Morningstar Category', observed=True).mean(numeric_only=True)
         
         # Find common Morningstar Categories between the two DataFrames
         common_categories = set(asset_class_averages.index).intersection(set(selection_averages.index))
@@ -229,7 +230,7 @@ def create_selection_summary_chart(filtered_selection):
     
     try:
         # Group by Morningstar Category and count
-        category_counts = filtered_selection['Morningstar Category'].value_counts().reset_index()
+        category_counts = count_by_category(filtered_selection).reset_index()
         category_counts.columns = ['Morningstar Category', 'count']
         
         # Create a pie chart of asset allocation
@@ -311,7 +312,8 @@ def create_risk_return_scatter(df):
             hover_name='Name',
             size_max=15,
             opacity=0.7,
-            title='Risk-Return Analysis'
+            title='Risk-Return Analysis',
+            render_mode='webgl'
         )
         
         # Try to add efficient frontier line if we have enough data points
@@ -510,7 +512,7 @@ def create_category_comparison_chart(df, numeric_columns):
     
     try:
         # Calculate averages by category
-        category_avg = df.groupby('Morningstar Category')[numeric_columns].mean()
+        category_avg = df.groupby('Morningstar Category', observed=True)[numeric_columns].mean()
         
         if category_avg.empty:
             return go.Figure().update_layout(
@@ -544,6 +546,64 @@ def create_category_comparison_chart(df, numeric_columns):
             margin=dict(l=50, r=50, t=80, b=50)
         )
 
+def create_category_comparison_charts(category_averages, metrics):
+    """
+    Create a grid of bar charts comparing category averages, one per metric.
+    
+    Parameters:
+    category_averages (DataFrame): DataFrame with category averages
+    metrics (list): List of metrics to display
+    
+    Returns:
+    Figure: Plotly figure object
+    """
+    if category_averages is None or category_averages.empty or not metrics:
+        return go.Figure().update_layout(
+            title="No category data available",
+            height=400,
+            margin=dict(l=50, r=50, t=80, b=50)
+        )
+    
+    try:
+        # Lay the charts out two per row
+        metrics = [m for m in metrics if m in category_averages.columns]
+        num_rows = (len(metrics) + 1) // 2
+        
+        fig = make_subplots(
+            rows=num_rows,
+            cols=2,
+            subplot_titles=[f'Average {metric} by Category' for metric in metrics],
+            vertical_spacing=0.25 / num_rows
+        )
+        
+        # Add a bar chart for each metric
+        for i, metric in enumerate(metrics):
+            fig.add_trace(
+                go.Bar(
+                    x=category_averages.index,
+                    y=category_averages[metric],
+                    name=metric,
+                    showlegend=False
+                ),
+                row=i // 2 + 1, col=i % 2 + 1
+            )
+        
+        fig.update_layout(
+            height=400 * num_rows,
+            margin=dict(l=50, r=50, t=80, b=50)
+        )
+        fig.update_xaxes(tickangle=-45)
+        
+        return fig
+        
+    except Exception as e:
+        print(f"Error creating category comparison charts: {str(e)}")
+        return go.Figure().update_layout(
+            title="Error creating category comparison charts",
+            height=400,
+            margin=dict(l=50, r=50, t=80, b=50)
+        )
+
 def create_portfolio_comparison_chart(all_funds, selected_funds, numeric_columns):
     """
     Create a chart comparing selected portfolio vs all funds.